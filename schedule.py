@@ -1,21 +1,78 @@
-﻿import json
+﻿import argparse
+import bisect
+import codecs
+import gzip
+import hashlib
+import hmac
+import http.client
+import json
 import os
+import pickle
 import re
+import sqlite3
+import ssl
+import stat
+import sys
+import tempfile
+import threading
 import time
-from dataclasses import dataclass
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta
 from urllib import parse as urlparse
-from urllib import request as urlrequest
 
-from flask import Flask, jsonify, render_template_string, request
+from flask import Flask, jsonify, render_template_string, request, stream_with_context
 
-SCHEDULE_PAGE_URL = "https://www.miet.ru/schedule/"
-SCHEDULE_DATA_URL = "https://miet.ru/schedule/data"
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SCHEDULE_PAGE_URL = os.getenv("MIET_PAGE_URL", "").strip() or "https://www.miet.ru/schedule/"
+SCHEDULE_DATA_URL = os.getenv("MIET_DATA_URL", "").strip() or "https://miet.ru/schedule/data"
 
 DEFAULT_GROUP = os.getenv("MIET_GROUP", "").strip() or "ИТД-11М"
 TIMEZONE_OFFSET = int(os.getenv("MIET_TZ_OFFSET", "3"))
 CACHE_TTL_SECONDS = int(os.getenv("MIET_CACHE_TTL", "300"))
+CACHE_SWR = os.getenv("MIET_CACHE_SWR", "1").strip().lower() not in ("0", "false", "no", "off")
+CACHE_MAX_STALE_SECONDS = int(os.getenv("MIET_CACHE_MAX_STALE", "3600"))
+CACHE_REFRESH_WORKERS = int(os.getenv("MIET_CACHE_REFRESH_WORKERS", "4"))
+CACHE_MAX_ENTRIES = int(os.getenv("MIET_CACHE_MAX_ENTRIES", "512"))
+CACHE_MAX_BYTES = int(os.getenv("MIET_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_SWEEP_INTERVAL = int(os.getenv("MIET_CACHE_SWEEP_INTERVAL", "60"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("MIET_RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_MAX_BYTES = int(
+    os.getenv("MIET_RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))
+)
+CACHE_BACKEND = os.getenv("MIET_CACHE_BACKEND", "memory").strip().lower()
+CACHE_PATH = os.getenv("MIET_CACHE_PATH", "").strip() or os.path.join(
+    tempfile.gettempdir(), "miet-schedule", "cache.sqlite3"
+)
+RANGE_MAX_WEEKS = int(os.getenv("MIET_RANGE_MAX_WEEKS", "30"))
+SEMESTER_WEEKS = int(os.getenv("MIET_SEMESTER_WEEKS", "18"))
+LESSON_MINUTES = int(os.getenv("MIET_LESSON_MINUTES", "90"))
+WARM_TOKEN = (os.getenv("MIET_WARM_TOKEN", "") or os.getenv("CRON_SECRET", "")).strip()
+WARM_GROUPS = os.getenv("MIET_WARM_GROUPS", "").strip()
+WARM_GROUPS_FILE = os.getenv("MIET_WARM_GROUPS_FILE", "").strip()
+WARM_CONCURRENCY = int(os.getenv("MIET_WARM_CONCURRENCY", "8"))
+STREAM_HEARTBEAT_SECONDS = int(os.getenv("MIET_STREAM_HEARTBEAT", "25"))
+STREAM_RETRY_MS = int(os.getenv("MIET_STREAM_RETRY_MS", str(CACHE_TTL_SECONDS * 1000)))
+BROWSER_MAX_AGE = int(os.getenv("MIET_BROWSER_MAX_AGE", "60"))
+PAGE_CDN_MAX_AGE = int(os.getenv("MIET_PAGE_CDN_MAX_AGE", "86400"))
+COMPRESS_MIN_BYTES = int(os.getenv("MIET_COMPRESS_MIN_BYTES", "512"))
+GZIP_LEVEL = int(os.getenv("MIET_GZIP_LEVEL", "9"))
+BROTLI_QUALITY = int(os.getenv("MIET_BROTLI_QUALITY", "9"))
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INLINE_INITIAL = os.getenv("MIET_INLINE_INITIAL", "").strip().lower() in ("1", "true", "yes", "on")
 REQUEST_TIMEOUT = float(os.getenv("MIET_TIMEOUT", "10"))
+CONNECT_TIMEOUT = float(os.getenv("MIET_CONNECT_TIMEOUT", str(min(REQUEST_TIMEOUT, 5.0))))
+READ_TIMEOUT = float(os.getenv("MIET_READ_TIMEOUT", str(REQUEST_TIMEOUT)))
+UPSTREAM_POOL_SIZE = int(os.getenv("MIET_POOL_SIZE", "8"))
+UPSTREAM_CHUNK_SIZE = int(os.getenv("MIET_CHUNK_SIZE", str(64 * 1024)))
+CAPTURE_RAW = os.getenv("MIET_CAPTURE_RAW", "").strip().lower() in ("1", "true", "yes", "on")
 WEEK_SHIFT = int(os.getenv("MIET_WEEK_SHIFT", "0"))
 WEEK_OVERRIDE = os.getenv("MIET_WEEK_OVERRIDE", "").strip()
 WEEK_START_STR = os.getenv("MIET_WEEK_START", "2026-02-02").strip()
@@ -25,9 +82,609 @@ WEEK_START_STR = os.getenv("MIET_WEEK_START", "2026-02-02").strip()
 class CacheEntry:
     ts: float
     value: object
+    size: int = 0
+
+
+class CacheBackend:
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def get(self, key: str) -> CacheEntry | None:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        raise NotImplementedError
+
+    def pop(self, key: str) -> CacheEntry | None:
+        raise NotImplementedError
+
+    def touch(self, key: str, ts: float) -> None:
+        raise NotImplementedError
+
+    def sweep(self, max_age: float) -> int:
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max(max_entries, 1)
+        self.max_bytes = max(max_bytes, 0)
+        self.bytes = 0
+        self.evictions = 0
+        self._items: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old.size
+            self._items[key] = entry
+            self.bytes += entry.size
+            while len(self._items) > 1 and (
+                len(self._items) > self.max_entries
+                or (self.max_bytes and self.bytes > self.max_bytes)
+            ):
+                _, evicted = self._items.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evictions += 1
+
+    def pop(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry.size
+            return entry
+
+    def touch(self, key: str, ts: float) -> None:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items[key] = CacheEntry(ts=ts, value=entry.value, size=entry.size)
+                self._items.move_to_end(key)
+
+    def sweep(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        with self._lock:
+            expired = [key for key, entry in self._items.items() if entry.ts < cutoff]
+            for key in expired:
+                self.bytes -= self._items.pop(key).size
+        return len(expired)
+
+
+def _check_private(path: str, forbidden: int) -> None:
+    info = os.lstat(path)
+    owner = os.getuid() if hasattr(os, "getuid") else info.st_uid
+    if stat.S_ISLNK(info.st_mode) or info.st_uid != owner or info.st_mode & forbidden:
+        raise RuntimeError(
+            f"Небезопасные права на {path} (uid {info.st_uid}, режим "
+            f"{oct(stat.S_IMODE(info.st_mode))}): общий кэш должен принадлежать uid {owner} "
+            "и быть закрыт от записи другими пользователями."
+        )
+
+
+class SQLiteCache(CacheBackend):
+    def __init__(self, path: str, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max(max_entries, 1)
+        self._local = threading.local()
+        self._inherited: list[sqlite3.Connection] = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            _check_private(directory, 0o022)
+        if os.path.lexists(path):
+            _check_private(path, 0o022)
+        conn = self._open()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "key TEXT PRIMARY KEY, ts REAL NOT NULL, size INTEGER NOT NULL, "
+                    "value BLOB NOT NULL)"
+                )
+        finally:
+            conn.close()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            if conn is not None:
+                self._inherited.append(conn)
+            conn = self._open()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __len__(self) -> int:
+        try:
+            return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def get(self, key: str) -> CacheEntry | None:
+        try:
+            row = self._connect().execute(
+                "SELECT ts, size, value FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            return CacheEntry(ts=row[0], value=pickle.loads(row[2]), size=row[1])
+        except (sqlite3.Error, pickle.UnpicklingError, AttributeError, EOFError) as exc:
+            app.logger.warning("Не удалось прочитать %s из общего кэша: %s", key, exc)
+            return None
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        try:
+            blob = pickle.dumps(entry.value, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, ts, size, value) VALUES (?, ?, ?, ?)",
+                    (key, entry.ts, entry.size, blob),
+                )
+        except sqlite3.Error as exc:
+            app.logger.warning("Не удалось записать %s в общий кэш: %s", key, exc)
+
+    def pop(self, key: str) -> CacheEntry | None:
+        entry = self.get(key)
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error:
+            pass
+        return entry
+
+    def touch(self, key: str, ts: float) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("UPDATE cache SET ts = ? WHERE key = ?", (ts, key))
+        except sqlite3.Error as exc:
+            app.logger.warning("Не удалось обновить %s в общем кэше: %s", key, exc)
+
+    def sweep(self, max_age: float) -> int:
+        try:
+            with self._connect() as conn:
+                removed = conn.execute(
+                    "DELETE FROM cache WHERE ts < ?", (time.time() - max_age,)
+                ).rowcount
+                removed += conn.execute(
+                    "DELETE FROM cache WHERE key NOT IN "
+                    "(SELECT key FROM cache ORDER BY ts DESC LIMIT ?)",
+                    (self.max_entries,),
+                ).rowcount
+            return removed
+        except sqlite3.Error:
+            return 0
+
+
+def _make_shared_cache() -> CacheBackend | None:
+    if CACHE_BACKEND in ("", "memory"):
+        return None
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCache(CACHE_PATH, CACHE_MAX_ENTRIES)
+    raise RuntimeError("MIET_CACHE_BACKEND должен быть memory или sqlite.")
+
+
+class Lesson:
+    __slots__ = (
+        "day",
+        "week",
+        "date",
+        "lesson_number",
+        "start",
+        "end",
+        "subject",
+        "type",
+        "teacher",
+        "room",
+    )
+
+    def __init__(
+        self,
+        day: int | None,
+        week: int | None,
+        date: date | None,
+        lesson_number: str,
+        start: str,
+        end: str,
+        subject: str,
+        type: str,
+        teacher: str,
+        room: str,
+    ) -> None:
+        self.day = day
+        self.week = week
+        self.date = date
+        self.lesson_number = sys.intern(lesson_number)
+        self.start = sys.intern(start)
+        self.end = sys.intern(end)
+        self.subject = sys.intern(subject)
+        self.type = sys.intern(type)
+        self.teacher = sys.intern(teacher)
+        self.room = sys.intern(room)
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    encodings: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(data) for data in self.encodings.values())
+
+
+class UpstreamPool:
+    def __init__(self, max_size: int, connect_timeout: float, read_timeout: float) -> None:
+        self.max_size = max(max_size, 1)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle: dict[tuple[str, str, int], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._ssl_context = ssl.create_default_context()
+        self.stats = {"requests": 0, "connects": 0, "reuses": 0, "retries": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def stats_snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["idle"] = sum(len(conns) for conns in self._idle.values())
+        stats["max_size"] = self.max_size
+        return stats
+
+    def _connect(self, key: tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(
+                host, port, timeout=self.connect_timeout, context=self._ssl_context
+            )
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        self._count("connects")
+        return conn
+
+    def _checkout(self, key: tuple[str, str, int]) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.stats["reuses"] += 1
+                return idle.pop(), True
+        return self._connect(key), False
+
+    def _checkin(self, key: tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _open(
+        self, key: tuple[str, str, int], method: str, path: str, body: bytes | None, headers: dict
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        conn, reused = self._checkout(key)
+        while True:
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                return conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not reused:
+                    raise
+                self._count("retries")
+                conn, reused = self._connect(key), False
+            except Exception:
+                conn.close()
+                raise
+
+    def _finish(
+        self,
+        key: tuple[str, str, int],
+        conn: http.client.HTTPConnection,
+        resp: http.client.HTTPResponse,
+    ) -> None:
+        resp.read()
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(key, conn)
+
+    @contextmanager
+    def stream(
+        self, method: str, url: str, body: bytes | None = None, headers: dict | None = None
+    ):
+        headers = dict(headers or {})
+        if not self._slots.acquire(timeout=self.connect_timeout + self.read_timeout):
+            raise TimeoutError("Пул соединений с miet.ru исчерпан.")
+        try:
+            for _ in range(4):
+                parts = urlparse.urlsplit(url)
+                scheme = parts.scheme or "https"
+                key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+                path = parts.path or "/"
+                if parts.query:
+                    path += "?" + parts.query
+                self._count("requests")
+                conn, resp = self._open(key, method, path, body, headers)
+                resp_headers = dict(resp.getheaders())
+                location = resp_headers.get("Location") or resp_headers.get("location")
+                if resp.status in (301, 302, 303, 307, 308) and location:
+                    self._finish(key, conn, resp)
+                    url = urlparse.urljoin(url, location)
+                    if resp.status in (301, 302, 303):
+                        method, body = "GET", None
+                        headers.pop("Content-Type", None)
+                    continue
+                if resp.status >= 400:
+                    self._finish(key, conn, resp)
+                    raise RuntimeError(f"HTTP Error {resp.status}: {resp.reason}")
+                try:
+                    yield resp_headers, resp
+                except BaseException:
+                    conn.close()
+                    raise
+                self._finish(key, conn, resp)
+                return
+            raise RuntimeError("Слишком много перенаправлений от miet.ru.")
+        finally:
+            self._slots.release()
+
+    def request(
+        self, method: str, url: str, body: bytes | None = None, headers: dict | None = None
+    ) -> tuple[dict, bytes]:
+        with self.stream(method, url, body=body, headers=headers) as (resp_headers, resp):
+            return resp_headers, resp.read()
+
+
+class ChallengePage(Exception):
+    def __init__(self, text: str) -> None:
+        super().__init__("Не удалось получить расписание: неожиданный ответ.")
+        self.text = text
+
+
+class JsonStream:
+    def __init__(self, chunks) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._exhausted = False
+        self.last = ""
+
+    def _fill(self) -> bool:
+        if self._exhausted:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._exhausted = True
+            return False
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str | None:
+        while True:
+            buffer = self._buffer
+            while self._pos < len(buffer) and buffer[self._pos] in " \t\r\n\ufeff":
+                self._pos += 1
+            if self._pos < len(buffer):
+                return buffer[self._pos]
+            if not self._fill():
+                return None
+
+    def skip(self, char: str) -> None:
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self._buffer, self._pos)
+        self._pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            if end < len(self._buffer) or not self._fill():
+                self.last = self._buffer[self._pos : end]
+                self._pos = end
+                return value
+
+    def rest(self) -> str:
+        return self._buffer[self._pos :] + "".join(self._chunks)
+
+    def _separator(self, close: str) -> bool:
+        char = self.peek()
+        if char == ",":
+            self._pos += 1
+            return False
+        if char == close:
+            self._pos += 1
+            return True
+        raise json.JSONDecodeError(f"Expecting ',' or {close!r}", self._buffer, self._pos)
+
+    def items(self, key: str):
+        if self.peek() != "{":
+            raise ChallengePage(self.rest())
+        self._pos += 1
+        if self.peek() == "}":
+            return
+        while True:
+            name = self.value()
+            if not isinstance(name, str):
+                raise json.JSONDecodeError("Expecting property name", self._buffer, self._pos)
+            self.skip(":")
+            if name == key and self.peek() == "[":
+                self._pos += 1
+                if self.peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self.value()
+                        if self._separator("]"):
+                            break
+            else:
+                self.value()
+            if self._separator("}"):
+                return
+
+
+class CookieJar:
+    def __init__(self) -> None:
+        self.cookie: str | None = None
+        self.obtained_at = 0.0
+        self.lifetime: float | None = None
+        self._lock = threading.Lock()
+        self.stats = {"sent": 0, "accepted": 0, "rejected": 0, "challenges": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def accepted(self) -> None:
+        self._count("accepted")
+
+    def challenged(self) -> None:
+        self._count("challenges")
+
+    def current(self) -> str | None:
+        with self._lock:
+            if self.cookie:
+                self.stats["sent"] += 1
+            return self.cookie
+
+    def store(self, cookie: str) -> None:
+        with self._lock:
+            if cookie != self.cookie:
+                self.cookie = cookie
+                self.obtained_at = time.time()
+
+    def reject(self, cookie: str) -> None:
+        with self._lock:
+            self.stats["rejected"] += 1
+            if cookie == self.cookie:
+                self.lifetime = time.time() - self.obtained_at
+                self.cookie = None
+
+    def stats_snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["has_cookie"] = self.cookie is not None
+            stats["age"] = round(time.time() - self.obtained_at, 1) if self.cookie else None
+            stats["observed_lifetime"] = (
+                round(self.lifetime, 1) if self.lifetime is not None else None
+            )
+        return stats
+
+
+@dataclass
+class Flight:
+    done: threading.Event = field(default_factory=threading.Event)
+    value: object = None
+    error: BaseException | None = None
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        rows = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            rows.append((repr(bound), total))
+        rows.append(("+Inf", self.count))
+        return rows
+
+
+@dataclass
+class RequestTiming:
+    endpoint: str
+    started: float = field(default_factory=time.perf_counter)
+    stages: dict[str, float] = field(default_factory=dict)
+
+    def header(self) -> str:
+        parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
 
 
-_cache: dict[str, CacheEntry] = {}
+def _source_digest() -> bytes:
+    try:
+        with open(__file__, "rb") as fh:
+            source = fh.read()
+    except OSError:
+        source = b""
+    return hashlib.blake2b(source, digest_size=16).digest()
+
+
+_cache = LRUCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES)
+_shared_cache = _make_shared_cache()
+_upstream = UpstreamPool(UPSTREAM_POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT)
+_cookie_jar = CookieJar()
+_response_cache = LRUCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES)
+_index_page: CachedResponse | None = None
+_version_key = _source_digest()
+_last_sweep = time.time()
+_version_listeners: list = []
+_inflight: dict[str, Flight] = {}
+_inflight_lock = threading.Lock()
+_refreshing: set[str] = set()
+_refresh_pool = ThreadPoolExecutor(
+    max_workers=max(CACHE_REFRESH_WORKERS, 1),
+    thread_name_prefix="miet-refresh",
+)
+_cache_stats = {
+    "hit": 0,
+    "stale": 0,
+    "miss": 0,
+    "shared": 0,
+    "refresh_errors": 0,
+    "response_hit": 0,
+    "response_miss": 0,
+    "unchanged": 0,
+}
+_stats_lock = threading.Lock()
+_cache_kinds: dict[tuple[str, str], int] = {}
+_upstream_errors: dict[str, int] = {}
+_ics_stats = {"written": 0, "skipped": 0}
+_stage_histograms: dict[tuple[str, str], Histogram] = {}
+_request_timing: ContextVar[RequestTiming | None] = ContextVar("miet_request_timing", default=None)
 
 app = Flask(__name__)
 
@@ -468,6 +1125,7 @@ INDEX_HTML = """<!doctype html>
         </section>
       </div>
     </main>
+    <script id="initial-data" type="application/json">null</script>
     <script>
       const THEME_KEY = "miet_theme";
       const FONT_KEY = "miet_font";
@@ -571,42 +1229,190 @@ INDEX_HTML = """<!doctype html>
         }
       }
 
+      const GROUP = {{ group|tojson }};
+      const TZ_OFFSET = {{ tz_offset|tojson }};
+      const WEEK_STORE_KEY = `miet_weeks:${GROUP}`;
+      const WEEK_STORE_LIMIT = 12;
+      let initialData = JSON.parse(document.getElementById("initial-data").textContent);
+      const DAY_MS = 24 * 60 * 60 * 1000;
+      const responseCache = new Map();
+      const weekCache = new Map();
+
+      async function fetchJson(url) {
+        const cached = responseCache.get(url);
+        const options = cached ? { headers: { "If-None-Match": cached.etag } } : {};
+        const resp = await fetch(url, options);
+        if (resp.status === 304 && cached) {
+          return cached.data;
+        }
+        const data = await resp.json();
+        const etag = resp.headers.get("ETag");
+        if (etag && data.ok) {
+          responseCache.set(url, { etag, data });
+        }
+        return data;
+      }
+
       let weekOffset = 0;
       let currentWeekNumber = 1;
       let weekCycle = 1;
+      let scheduleVersion = null;
+      let liveVersion = null;
+      let staticManifest;
 
-      function weekParam() {
-        return weekOffset === 0 ? "" : `?week=${weekOffset}`;
+      function localToday() {
+        const now = new Date(Date.now() + TZ_OFFSET * 60 * 60 * 1000);
+        return new Date(Date.UTC(now.getUTCFullYear(), now.getUTCMonth(), now.getUTCDate()));
       }
 
-      function updateNav() {
-        const prev = document.getElementById("prev-week");
-        if (weekCycle > 1) {
-          const minOffset = -(currentWeekNumber - 1);
-          prev.disabled = weekOffset <= minOffset;
-        } else {
-          prev.disabled = false;
+      function weekKey(offset) {
+        return `${localToday().toISOString().slice(0, 10)}|${offset}`;
+      }
+
+      function restoreWeeks() {
+        const prefix = weekKey("");
+        try {
+          const stored = JSON.parse(localStorage.getItem(WEEK_STORE_KEY) || "[]");
+          for (const [key, data] of stored) {
+            if (key.startsWith(prefix)) {
+              weekCache.set(key, data);
+            }
+          }
+        } catch (error) {
+          localStorage.removeItem(WEEK_STORE_KEY);
         }
       }
 
-      async function load(mode) {
-        const target = document.getElementById(mode + "-content");
-        target.innerHTML = '<div class="empty">Загрузка...</div>';
+      function rememberWeek(offset, data) {
+        if (!data || !data.ok) return;
+        const key = weekKey(offset);
+        weekCache.delete(key);
+        weekCache.set(key, data);
+        while (weekCache.size > WEEK_STORE_LIMIT) {
+          weekCache.delete(weekCache.keys().next().value);
+        }
+        try {
+          localStorage.setItem(WEEK_STORE_KEY, JSON.stringify([...weekCache]));
+        } catch (error) {
+          localStorage.removeItem(WEEK_STORE_KEY);
+        }
+      }
 
-        const resp = await fetch(`/api/${mode}${weekParam()}`);
-        const data = await resp.json();
+      function cachedWeek(offset) {
+        const data = weekCache.get(weekKey(offset));
+        if (!data || (liveVersion !== null && data.version !== liveVersion)) {
+          return null;
+        }
+        return data;
+      }
+
+      async function loadManifest() {
+        if (staticManifest === undefined) {
+          try {
+            const resp = await fetch("/static/manifest.json");
+            staticManifest = resp.ok ? await resp.json() : null;
+          } catch (error) {
+            staticManifest = null;
+          }
+        }
+        return staticManifest;
+      }
+
+      function mondayOf(day) {
+        return new Date(day.getTime() - ((day.getUTCDay() + 6) % 7) * DAY_MS);
+      }
+
+      async function loadStatic(offset) {
+        const manifest = await loadManifest();
+        const entry = manifest && manifest.groups && manifest.groups[GROUP];
+        if (
+          !entry ||
+          typeof entry.dated !== "boolean" ||
+          (liveVersion !== null && entry.version !== liveVersion)
+        ) {
+          return null;
+        }
+        const today = localToday();
+        const todayIso = today.toISOString().slice(0, 10);
+        const baseMonday = mondayOf(new Date(`${manifest.week_start}T00:00:00Z`));
+        const weeksSince = Math.round((mondayOf(today) - baseMonday) / (7 * DAY_MS));
+        const number = Math.max(weeksSince + 1 + offset, 1);
+        const day = new Date(today.getTime() + offset * 7 * DAY_MS).toISOString().slice(0, 10);
+        const inRange = (value) => value >= entry.first_date && value <= entry.last_date;
+        if (number > manifest.weeks || !inRange(day) || !inRange(todayIso)) {
+          return null;
+        }
+        const base = `/static/${encodeURIComponent(GROUP)}`;
+        try {
+          const [week, nowData, dayData] = await Promise.all([
+            fetchJson(`${base}/week/${number}.json`),
+            fetchJson(`${base}/today/${todayIso}.json`),
+            day === todayIso ? null : fetchJson(`${base}/today/${day}.json`),
+          ]);
+          const viewData = dayData || nowData;
+          if (!week.ok || !nowData.ok || !viewData.ok) {
+            return null;
+          }
+          return {
+            ...week,
+            week_label_now: nowData.week_label_now,
+            today_label: entry.dated ? viewData.today_label : nowData.today_label,
+            lessons: viewData.lessons,
+          };
+        } catch (error) {
+          return null;
+        }
+      }
 
+      async function fetchWeek(offset) {
+        const url = offset === 0 ? "/api/bundle" : `/api/bundle?week=${offset}`;
+        const data = (await loadStatic(offset)) || (await fetchJson(url));
+        rememberWeek(offset, data);
+        return data;
+      }
+
+      function minWeekOffset() {
+        return weekCycle > 1 ? -(currentWeekNumber - 1) : -Infinity;
+      }
+
+      function updateNav() {
+        const prev = document.getElementById("prev-week");
+        prev.disabled = weekOffset <= minWeekOffset();
+      }
+
+      function prefetchNeighbours() {
+        const idle = window.requestIdleCallback || ((callback) => setTimeout(callback, 200));
+        idle(async () => {
+          for (const offset of [weekOffset + 1, weekOffset - 1]) {
+            if (offset < minWeekOffset() || cachedWeek(offset)) continue;
+            try {
+              await fetchWeek(offset);
+            } catch (error) {
+              return;
+            }
+          }
+        });
+      }
+
+      function render(data) {
+        const todayTarget = document.getElementById("today-content");
+        const weekTarget = document.getElementById("week-content");
         if (!data.ok) {
-          target.innerHTML = `<div class="error">${data.error || "Ошибка получения расписания."}</div>`;
+          const message = `<div class="error">${data.error || "Ошибка получения расписания."}</div>`;
+          todayTarget.innerHTML = message;
+          weekTarget.innerHTML = message;
           return;
         }
 
         if (typeof data.week_number === "number") {
-          currentWeekNumber = data.week_number;
+          currentWeekNumber = data.week_number - weekOffset;
         }
         if (typeof data.week_cycle === "number") {
           weekCycle = data.week_cycle;
         }
+        if (typeof data.version === "number") {
+          scheduleVersion = data.version;
+        }
         updateNav();
 
         const label = document.getElementById("week-label");
@@ -632,46 +1438,404 @@ INDEX_HTML = """<!doctype html>
           label.textContent = "";
         }
 
-        if (mode === "today") {
-          renderTable(target, data.lessons || []);
+        renderTable(todayTarget, data.lessons || []);
+        renderWeek(weekTarget, data.days || []);
+      }
+
+      async function load() {
+        const offset = weekOffset;
+        if (initialData && offset === 0) {
+          const data = initialData;
+          initialData = null;
+          rememberWeek(offset, data);
+          render(data);
+          prefetchNeighbours();
+          return;
+        }
+        const cached = cachedWeek(offset);
+        if (cached) {
+          render(cached);
+          if (liveVersion !== null && cached.version === liveVersion) {
+            prefetchNeighbours();
+            return;
+          }
         } else {
-          renderWeek(target, data.days || []);
+          document.getElementById("today-content").innerHTML = '<div class="empty">Загрузка...</div>';
+          document.getElementById("week-content").innerHTML = '<div class="empty">Загрузка...</div>';
         }
 
+        let data;
+        try {
+          data = await fetchWeek(offset);
+        } catch (error) {
+          if (cached) return;
+          data = { ok: false, error: "Нет соединения с сервером." };
+        }
+        if (offset !== weekOffset) return;
+        if (!cached || !data.ok || data.version !== cached.version) {
+          render(data);
+        }
+        prefetchNeighbours();
       }
 
-      load("today");
-      load("week");
+      function watchVersion() {
+        if (!window.EventSource) return;
+        const source = new EventSource("/api/stream");
+        source.addEventListener("version", (event) => {
+          const data = JSON.parse(event.data);
+          liveVersion = data.version;
+          if (scheduleVersion !== null && data.version !== scheduleVersion) {
+            load();
+          }
+        });
+      }
+
+      restoreWeeks();
+      load().finally(watchVersion);
+
+      if ("serviceWorker" in navigator) {
+        navigator.serviceWorker.register("/sw.js").catch(() => {});
+      }
 
       document.getElementById("prev-week").addEventListener("click", () => {
         weekOffset -= 1;
-        load("today");
-        load("week");
+        load();
       });
 
       document.getElementById("next-week").addEventListener("click", () => {
         weekOffset += 1;
-        load("today");
-        load("week");
+        load();
       });
     </script>
   </body>
 </html>
 """
 
+SERVICE_WORKER_JS = """const CACHE_NAME = "miet-schedule-v1";
+const OFFLINE_PATHS = ["/api/bundle", "/static/"];
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(caches.open(CACHE_NAME).then((cache) => cache.add("/")));
+  self.skipWaiting();
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(
+    caches
+      .keys()
+      .then((names) =>
+        Promise.all(names.filter((name) => name !== CACHE_NAME).map((name) => caches.delete(name)))
+      )
+      .then(() => self.clients.claim())
+  );
+});
+
+self.addEventListener("fetch", (event) => {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (request.method !== "GET" || url.origin !== self.location.origin) return;
+  const keep = url.pathname === "/" || OFFLINE_PATHS.some((path) => url.pathname.startsWith(path));
+  if (!keep) return;
+  event.respondWith(
+    fetch(request)
+      .then((response) => {
+        if (response.status === 200) {
+          const copy = response.clone();
+          caches.open(CACHE_NAME).then((cache) => cache.put(request, copy));
+        }
+        return response;
+      })
+      .catch(() => caches.match(request).then((cached) => cached || Response.error()))
+  );
+});
+"""
+
 
-def _cache_get(key: str):
+def _cache_entry(key: str) -> CacheEntry | None:
     entry = _cache.get(key)
+    if _shared_cache is None:
+        return entry
+    if entry is not None and time.time() - entry.ts <= CACHE_TTL_SECONDS:
+        return entry
+    shared = _shared_cache.get(key)
+    if shared is not None and (entry is None or shared.ts > entry.ts):
+        _count_cache("shared")
+        _cache.set(key, shared)
+        return shared
+    return entry
+
+
+def _cache_lookup(key: str) -> tuple[object, str]:
+    entry = _cache_entry(key)
     if not entry:
-        return None
-    if time.time() - entry.ts > CACHE_TTL_SECONDS:
-        _cache.pop(key, None)
-        return None
-    return entry.value
+        return None, "miss"
+    age = time.time() - entry.ts
+    if age <= CACHE_TTL_SECONDS:
+        return entry.value, "hit"
+    if CACHE_SWR and age <= CACHE_MAX_STALE_SECONDS:
+        return entry.value, "stale"
+    _cache.pop(key)
+    if _shared_cache is not None:
+        _shared_cache.pop(key)
+    return None, "miss"
+
+
+def _cache_get(key: str):
+    value, state = _cache_lookup(key)
+    return value if state == "hit" else None
+
+
+def _approx_size(value: object, seen: set[int] | None = None) -> int:
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += _approx_size(key, seen) + _approx_size(item, seen)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            size += _approx_size(item, seen)
+    elif hasattr(type(value), "__slots__"):
+        for name in type(value).__slots__:
+            size += _approx_size(getattr(value, name, None), seen)
+    return size
+
+
+def _cache_max_age() -> float:
+    if CACHE_SWR:
+        return max(CACHE_TTL_SECONDS, CACHE_MAX_STALE_SECONDS)
+    return CACHE_TTL_SECONDS
+
+
+def _cache_touch(key: str) -> None:
+    now = time.time()
+    _cache.touch(key, now)
+    if _shared_cache is not None:
+        _shared_cache.touch(key, now)
 
 
 def _cache_set(key: str, value: object) -> None:
-    _cache[key] = CacheEntry(ts=time.time(), value=value)
+    global _last_sweep
+    now = time.time()
+    entry = CacheEntry(ts=now, value=value, size=_approx_size(value))
+    _cache.set(key, entry)
+    if _shared_cache is not None:
+        _shared_cache.set(key, entry)
+    if now - _last_sweep >= CACHE_SWEEP_INTERVAL:
+        _last_sweep = now
+        _cache.sweep(_cache_max_age())
+        if _shared_cache is not None:
+            _shared_cache.sweep(_cache_max_age())
+
+
+def _single_flight(key: str, loader):
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = Flight()
+            _inflight[key] = flight
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+    try:
+        flight.value = loader()
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+    return flight.value
+
+
+def _notify_version(group: str, version: int) -> None:
+    for listener in list(_version_listeners):
+        try:
+            listener(group, version)
+        except Exception as exc:
+            app.logger.warning("Не удалось уведомить о новой версии %s: %s", group, exc)
+
+
+def _count_cache(state: str, key: str | None = None) -> None:
+    with _stats_lock:
+        _cache_stats[state] += 1
+        if key is not None:
+            kind = (key.split(":", 1)[0], state.removeprefix("response_"))
+            _cache_kinds[kind] = _cache_kinds.get(kind, 0) + 1
+
+
+def _count_upstream_error(exc: BaseException) -> None:
+    name = type(exc).__name__
+    with _stats_lock:
+        _upstream_errors[name] = _upstream_errors.get(name, 0) + 1
+
+
+def _observe(stage: str, seconds: float) -> None:
+    timing = _request_timing.get()
+    endpoint = "background"
+    if timing is not None:
+        endpoint = timing.endpoint
+        timing.stages[stage] = timing.stages.get(stage, 0.0) + seconds
+    with _stats_lock:
+        histogram = _stage_histograms.get((stage, endpoint))
+        if histogram is None:
+            histogram = _stage_histograms[(stage, endpoint)] = Histogram(METRICS_BUCKETS)
+        histogram.observe(seconds)
+
+
+@contextmanager
+def _timed(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observe(stage, time.perf_counter() - started)
+
+
+def _metric_labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _render_metrics() -> str:
+    with _stats_lock:
+        events = dict(_cache_stats)
+        kinds = dict(_cache_kinds)
+        errors = dict(_upstream_errors)
+        ics = dict(_ics_stats)
+        histograms = {
+            key: (histogram.cumulative(), histogram.sum, histogram.count)
+            for key, histogram in _stage_histograms.items()
+        }
+    lines = [
+        "# HELP miet_stage_seconds Time spent in each processing stage.",
+        "# TYPE miet_stage_seconds histogram",
+    ]
+    for (stage, endpoint), (buckets, total, count) in sorted(histograms.items()):
+        for bound, value in buckets:
+            labels = _metric_labels(stage=stage, endpoint=endpoint, le=bound)
+            lines.append(f"miet_stage_seconds_bucket{labels} {value}")
+        labels = _metric_labels(stage=stage, endpoint=endpoint)
+        lines.append(f"miet_stage_seconds_sum{labels} {total:.6f}")
+        lines.append(f"miet_stage_seconds_count{labels} {count}")
+    lines += [
+        "# HELP miet_cache_lookups_total Cache lookups by key type and result.",
+        "# TYPE miet_cache_lookups_total counter",
+    ]
+    for (kind, result), value in sorted(kinds.items()):
+        lines.append(f"miet_cache_lookups_total{_metric_labels(kind=kind, result=result)} {value}")
+    lines += [
+        "# HELP miet_cache_events_total Cache events.",
+        "# TYPE miet_cache_events_total counter",
+    ]
+    for event, value in sorted(events.items()):
+        lines.append(f"miet_cache_events_total{_metric_labels(event=event)} {value}")
+    lines += [
+        "# HELP miet_upstream_errors_total Failed upstream requests by error type.",
+        "# TYPE miet_upstream_errors_total counter",
+    ]
+    for error, value in sorted(errors.items()):
+        lines.append(f"miet_upstream_errors_total{_metric_labels(error=error)} {value}")
+    lines += [
+        "# HELP miet_ics_events_total Lessons written to or skipped from iCalendar exports.",
+        "# TYPE miet_ics_events_total counter",
+    ]
+    for result, value in sorted(ics.items()):
+        lines.append(f"miet_ics_events_total{_metric_labels(result=result)} {value}")
+    upstream = _upstream.stats_snapshot()
+    lines += [
+        "# HELP miet_upstream_events_total Upstream connection pool events.",
+        "# TYPE miet_upstream_events_total counter",
+    ]
+    for event in ("requests", "connects", "reuses", "retries"):
+        lines.append(f"miet_upstream_events_total{_metric_labels(event=event)} {upstream[event]}")
+    cookie = _cookie_jar.stats_snapshot()
+    lines += [
+        "# HELP miet_cookie_events_total wl= cookie handshake events.",
+        "# TYPE miet_cookie_events_total counter",
+    ]
+    for event in ("sent", "accepted", "rejected", "challenges"):
+        lines.append(f"miet_cookie_events_total{_metric_labels(event=event)} {cookie[event]}")
+    gauges = [
+        ("miet_cache_entries", "Entries per cache.", "l1", len(_cache)),
+        ("miet_cache_entries", None, "response", len(_response_cache)),
+        ("miet_cache_bytes", "Approximate bytes per cache.", "l1", _cache.bytes),
+        ("miet_cache_bytes", None, "response", _response_cache.bytes),
+        ("miet_cache_evictions_total", "Evictions per cache.", "l1", _cache.evictions),
+        ("miet_cache_evictions_total", None, "response", _response_cache.evictions),
+    ]
+    for name, help_text, cache, value in gauges:
+        if help_text:
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines.append(f"{name}{_metric_labels(cache=cache)} {value}")
+    lines += [
+        "# HELP miet_inflight_loads Upstream loads currently in flight.",
+        "# TYPE miet_inflight_loads gauge",
+        f"miet_inflight_loads {len(_inflight) + len(_refreshing)}",
+        "# HELP miet_upstream_idle_connections Idle keep-alive connections.",
+        "# TYPE miet_upstream_idle_connections gauge",
+        f"miet_upstream_idle_connections {upstream['idle']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _cache_stats_snapshot() -> dict:
+    with _stats_lock:
+        stats = dict(_cache_stats)
+    stats["entries"] = len(_cache)
+    stats["bytes"] = _cache.bytes
+    stats["evictions"] = _cache.evictions
+    stats["backend"] = type(_shared_cache).__name__ if _shared_cache else "memory"
+    stats["response_entries"] = len(_response_cache)
+    stats["response_bytes"] = _response_cache.bytes
+    stats["refreshing"] = len(_refreshing)
+    return stats
+
+
+def _background_refresh(key: str, loader) -> None:
+    try:
+        _single_flight(key, loader)
+    except Exception as exc:
+        _count_cache("refresh_errors")
+        app.logger.warning("Не удалось обновить %s в фоне: %s", key, exc)
+    finally:
+        with _inflight_lock:
+            _refreshing.discard(key)
+
+
+def _refresh_in_background(key: str, loader) -> None:
+    with _inflight_lock:
+        if key in _refreshing or key in _inflight:
+            return
+        _refreshing.add(key)
+    _refresh_pool.submit(_background_refresh, key, loader)
+
+
+def _cached(key: str, loader, allow_stale: bool = True, wait: bool = True):
+    value, state = _cache_lookup(key)
+    if state == "stale" and not allow_stale:
+        state = "miss"
+    _count_cache(state, key)
+    if state == "hit":
+        return value
+    if state == "stale":
+        _refresh_in_background(key, loader)
+        return value
+    if not wait:
+        _refresh_in_background(key, loader)
+        return None
+    return _single_flight(key, loader)
 
 
 def _now_local() -> datetime:
@@ -686,7 +1850,7 @@ def _week_start_date() -> date:
         raise RuntimeError("MIET_WEEK_START должен быть в формате YYYY-MM-DD.") from exc
 
 
-def _post_schedule(group: str, cookie: str | None = None) -> tuple[str, dict]:
+def _schedule_request(group: str, cookie: str | None = None) -> tuple[bytes, dict]:
     data = urlparse.urlencode({"group": group}).encode("utf-8")
     headers = {
         "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
@@ -699,16 +1863,37 @@ def _post_schedule(group: str, cookie: str | None = None) -> tuple[str, dict]:
     }
     if cookie:
         headers["Cookie"] = cookie
-    req = urlrequest.Request(
-        SCHEDULE_DATA_URL,
-        data=data,
-        headers=headers,
-        method="POST",
-    )
-    with urlrequest.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
-        text = resp.read().decode("utf-8", errors="ignore")
-        resp_headers = dict(resp.headers.items())
-    return text, resp_headers
+    return data, headers
+
+
+def _iter_text(resp):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    while True:
+        chunk = resp.read(UPSTREAM_CHUNK_SIZE)
+        if not chunk:
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+            return
+        yield decoder.decode(chunk)
+
+
+@contextmanager
+def _post_schedule(group: str, cookie: str | None = None, stage: str = "upstream"):
+    data, headers = _schedule_request(group, cookie)
+    started = time.perf_counter()
+    try:
+        with _upstream.stream(
+            "POST",
+            SCHEDULE_DATA_URL,
+            body=data,
+            headers=headers,
+        ) as (resp_headers, resp):
+            _observe(stage, time.perf_counter() - started)
+            yield _iter_text(resp), resp_headers
+    except (OSError, http.client.HTTPException, RuntimeError) as exc:
+        _count_upstream_error(exc)
+        raise
 
 
 def _extract_cookie(text: str, headers: dict) -> str | None:
@@ -726,25 +1911,129 @@ def _extract_cookie(text: str, headers: dict) -> str | None:
 
 
 def _load_schedule_json(group: str) -> dict:
+    return _cached(f"raw:{group}", lambda: _fetch_schedule_json(group))
+
+
+def _schedule_exchange(decode):
+    known_cookie = _cookie_jar.current()
+    chunks, headers = yield known_cookie
+    try:
+        result = decode(chunks)
+        if known_cookie:
+            _cookie_jar.accepted()
+        return result
+    except ChallengePage as page:
+        if known_cookie:
+            _cookie_jar.reject(known_cookie)
+        cookie = _extract_cookie(page.text, headers)
+        if not cookie:
+            raise RuntimeError("Не удалось получить расписание: неожиданный ответ.") from None
+    _cookie_jar.challenged()
+    chunks, _ = yield cookie
+    try:
+        result = decode(chunks)
+    except ChallengePage as page:
+        raise RuntimeError(str(page)) from None
+    _cookie_jar.store(cookie)
+    return result
+
+
+def _run_exchange(group: str, decode):
+    exchange = _schedule_exchange(decode)
+    cookie = next(exchange)
+    stage = "upstream"
+    while True:
+        with _post_schedule(group, cookie=cookie, stage=stage) as (chunks, headers):
+            try:
+                with _timed("parse"):
+                    cookie = exchange.send((chunks, headers))
+            except StopIteration as stop:
+                return stop.value
+        stage = "cookie_retry"
+
+
+def _decode_document(chunks) -> dict:
+    payload = "".join(chunks).lstrip("\ufeff").strip()
+    try:
+        return json.loads(payload)
+    except json.JSONDecodeError:
+        raise ChallengePage(payload) from None
+
+
+def _decode_entries(chunks, known: dict | None = None, seen: dict | None = None) -> list[Lesson]:
+    entries = []
+    stream = JsonStream(chunks)
+    for item in stream.items("Data"):
+        digest = hashlib.blake2b(stream.last.encode("utf-8"), digest_size=12).digest()
+        if known is not None and digest in known:
+            lesson = known[digest]
+        else:
+            lesson = _parse_item(item)
+        if seen is not None:
+            seen[digest] = lesson
+        if lesson is not None:
+            entries.append(lesson)
+    return entries
+
+
+def _capturing(decode, captured: list[str]):
+    def run(chunks):
+        captured.clear()
+
+        def tee():
+            for chunk in chunks:
+                captured.append(chunk)
+                yield chunk
+
+        return decode(tee())
+
+    return run
+
+
+def _fetch_schedule_json(group: str) -> dict:
     cached = _cache_get(f"raw:{group}")
     if cached:
         return cached
+    data = _run_exchange(group, _decode_document)
+    _cache_set(f"raw:{group}", data)
+    return data
 
-    text, headers = _post_schedule(group)
-    payload = text.lstrip("\ufeff").strip()
-    try:
-        data = json.loads(payload)
-        _cache_set(f"raw:{group}", data)
-        return data
-    except json.JSONDecodeError:
-        cookie = _extract_cookie(payload, headers)
-        if not cookie:
-            raise RuntimeError("Не удалось получить расписание: неожиданный ответ.")
-        text, _ = _post_schedule(group, cookie=cookie)
-        payload = text.lstrip("\ufeff").strip()
-        data = json.loads(payload)
-        _cache_set(f"raw:{group}", data)
-        return data
+
+def _fingerprinting(decode, fingerprint: list[str]):
+    def run(chunks):
+        digest = hashlib.blake2b(digest_size=16)
+
+        def tee():
+            for chunk in chunks:
+                digest.update(chunk.encode("utf-8"))
+                yield chunk
+
+        result = decode(tee())
+        fingerprint[:] = [digest.hexdigest()]
+        return result
+
+    return run
+
+
+def _entries_decoder(previous: CacheEntry | None):
+    known = previous.value.get("items") if previous is not None else None
+    fingerprint: list[str] = []
+    items: dict[bytes, Lesson | None] = {}
+
+    def decode(chunks):
+        return _decode_entries(chunks, known, items)
+
+    return _fingerprinting(decode, fingerprint), fingerprint, items
+
+
+def _fetch_schedule_entries(group: str) -> tuple[list[Lesson], str, dict]:
+    decode, fingerprint, items = _entries_decoder(_cache_entry(f"parsed:{group}"))
+    if not CAPTURE_RAW:
+        return _run_exchange(group, decode), fingerprint[0], items
+    captured: list[str] = []
+    entries = _run_exchange(group, _capturing(decode, captured))
+    _cache_set(f"raw:{group}", _decode_document(captured))
+    return entries, fingerprint[0], items
 
 
 def _to_int(value):
@@ -761,7 +2050,7 @@ def _extract_time(value) -> str:
         seconds = value / 1000 if value > 1_000_000_000_000 else value
         return datetime.utcfromtimestamp(seconds).strftime("%H:%M")
     if isinstance(value, str):
-        match = re.search(r"/Date\\((\\d+)\\)/", value)
+        match = re.search(r"/Date\((\d+)\)/", value)
         if match:
             seconds = int(match.group(1)) / 1000
             return datetime.utcfromtimestamp(seconds).strftime("%H:%M")
@@ -769,7 +2058,7 @@ def _extract_time(value) -> str:
             dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
             return dt.strftime("%H:%M")
         except ValueError:
-            match = re.search(r"(\\d{1,2}:\\d{2})", value)
+            match = re.search(r"(\d{1,2}:\d{2})", value)
             return match.group(1) if match else value
     return str(value)
 
@@ -782,7 +2071,7 @@ def _extract_date_value(value) -> date | None:
         dt = datetime.utcfromtimestamp(seconds)
         return dt.date() if dt.year >= 2000 else None
     if isinstance(value, str):
-        match = re.search(r"/Date\\((\\d+)\\)/", value)
+        match = re.search(r"/Date\((\d+)\)/", value)
         if match:
             seconds = int(match.group(1)) / 1000
             dt = datetime.utcfromtimestamp(seconds)
@@ -791,7 +2080,7 @@ def _extract_date_value(value) -> date | None:
             dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
             return dt.date() if dt.year >= 2000 else None
         except ValueError:
-            match = re.search(r"(\\d{4}-\\d{2}-\\d{2})", value)
+            match = re.search(r"(\d{4}-\d{2}-\d{2})", value)
             if match:
                 try:
                     return date.fromisoformat(match.group(1))
@@ -824,46 +2113,51 @@ def _split_subject(name: str) -> tuple[str, str]:
     return cleaned, lesson_type
 
 
-def _parse_entries(data: dict) -> list[dict]:
+def _parse_item(item: dict) -> Lesson | None:
+    time_block = item.get("Time") or {}
+    subject, lesson_type = _split_subject((item.get("Class") or {}).get("Name") or "")
+    lesson = Lesson(
+        day=_to_int(item.get("Day")),
+        week=_to_int(item.get("DayNumber")),
+        date=_extract_entry_date(item),
+        lesson_number=re.sub(
+            r"\s*пара\s*$",
+            "",
+            str(time_block.get("Time") or "").strip(),
+            flags=re.IGNORECASE,
+        ),
+        start=_extract_time(time_block.get("TimeFrom")),
+        end=_extract_time(time_block.get("TimeTo")),
+        subject=subject,
+        type=lesson_type,
+        teacher=(item.get("Class") or {}).get("TeacherFull") or "",
+        room=(item.get("Room") or {}).get("Name") or "",
+    )
+    if _should_skip_lesson(lesson):
+        return None
+    return lesson
+
+
+def _parse_entries(data: dict) -> list[Lesson]:
     entries = []
     for item in data.get("Data", []):
-        time_block = item.get("Time") or {}
-        lesson = {
-            "day": _to_int(item.get("Day")),
-            "week": _to_int(item.get("DayNumber")),
-            "lesson_number": re.sub(
-                r"\s*пара\s*$",
-                "",
-                str(time_block.get("Time") or "").strip(),
-                flags=re.IGNORECASE,
-            ),
-            "start": _extract_time(time_block.get("TimeFrom")),
-            "end": _extract_time(time_block.get("TimeTo")),
-            "subject_raw": (item.get("Class") or {}).get("Name") or "",
-            "teacher": (item.get("Class") or {}).get("TeacherFull") or "",
-            "room": (item.get("Room") or {}).get("Name") or "",
-            "date": _extract_entry_date(item),
-        }
-        subject, lesson_type = _split_subject(lesson["subject_raw"])
-        lesson["subject"] = subject
-        lesson["type"] = lesson_type
-        if _should_skip_lesson(lesson):
-            continue
-        entries.append(lesson)
+        lesson = _parse_item(item)
+        if lesson is not None:
+            entries.append(lesson)
     return entries
 
 
-def _should_skip_lesson(lesson: dict) -> bool:
-    subject = lesson.get("subject") or ""
-    room = lesson.get("room") or ""
-    lesson_number = str(lesson.get("lesson_number") or "")
+def _should_skip_lesson(lesson: Lesson) -> bool:
+    subject = lesson.subject or ""
+    room = lesson.room or ""
+    lesson_number = str(lesson.lesson_number or "")
     if (
         "Финансовая грамотность в условиях цифровой экономики" in subject
         and "Виртуальная аудитория 1" in room
     ):
         return True
     if (
-        lesson.get("day") == 6
+        lesson.day == 6
         and "8" in lesson_number
         and "Финансовая грамотность в условиях цифровой экономики" in subject
     ):
@@ -871,8 +2165,8 @@ def _should_skip_lesson(lesson: dict) -> bool:
     return False
 
 
-def _week_meta(entries: list[dict]) -> dict:
-    week_values = sorted({e["week"] for e in entries if e["week"] is not None})
+def _week_meta(entries: list[Lesson]) -> dict:
+    week_values = sorted({e.week for e in entries if e.week is not None})
     if not week_values:
         return {"cycle": 1, "shift": 0, "labels": ["Неделя"]}
     cycle = len(week_values)
@@ -1005,7 +2299,7 @@ def _current_week_index(meta: dict, today: date, data: dict) -> int:
     return index
 
 
-def _auto_week_index(entries: list[dict], meta: dict, today: date, data: dict) -> int:
+def _auto_week_index(entries: list[Lesson], meta: dict, today: date, data: dict) -> int:
     index = _current_week_index(meta, today, data)
     cycle = meta.get("cycle", 1)
     if cycle <= 1:
@@ -1016,8 +2310,9 @@ def _auto_week_index(entries: list[dict], meta: dict, today: date, data: dict) -
         count = sum(
             1
             for e in entries
-            if e["day"] == day_number
-            and ((e["week"] + meta["shift"]) % cycle) == idx
+            if e.day == day_number
+            and e.week is not None
+            and ((e.week + meta["shift"]) % cycle) == idx
         )
         counts.append(count)
     max_count = max(counts) if counts else 0
@@ -1036,43 +2331,95 @@ def _linear_week_number(today: date, week_offset: int = 0) -> int:
     return max(weeks_since + 1 + week_offset, 1)
 
 
-def _format_lesson(entry: dict) -> dict:
-    time_label = entry["start"]
-    if entry["end"]:
-        time_label = f"{entry['start']}\n{entry['end']}"
-    room = entry.get("room", "")
+def _format_lesson(entry: Lesson) -> dict:
+    time_label = entry.start
+    if entry.end:
+        time_label = f"{entry.start}\n{entry.end}"
+    room = entry.room
     if "Виртуальная аудитория" in room:
         room = "Онлайн"
     return {
-        "lesson": entry.get("lesson_number", ""),
+        "lesson": entry.lesson_number,
         "time": time_label,
-        "subject": entry.get("subject", ""),
-        "type": entry.get("type", ""),
-        "teacher": entry.get("teacher", ""),
+        "subject": entry.subject,
+        "type": entry.type,
+        "teacher": entry.teacher,
         "room": room,
     }
 
 
+def _format_lessons(entries: tuple[Lesson, ...]) -> list[dict]:
+    return [_format_lesson(entry) for entry in entries]
+
+
+def _lesson_sort_key(entry: Lesson) -> tuple[str, str]:
+    return (entry.lesson_number or "", entry.start or "")
+
+
+def _build_index(entries: list[Lesson], meta: dict) -> dict:
+    by_week_day: dict[tuple[int, int], list[Lesson]] = {}
+    by_date: dict[date, list[Lesson]] = {}
+    for entry in sorted(entries, key=_lesson_sort_key):
+        if entry.date:
+            by_date.setdefault(entry.date, []).append(entry)
+        if entry.week is not None and entry.day is not None:
+            week_index = (entry.week + meta["shift"]) % meta["cycle"]
+            by_week_day.setdefault((week_index, entry.day), []).append(entry)
+    return {
+        "by_week_day": {key: tuple(value) for key, value in by_week_day.items()},
+        "by_date": {key: tuple(value) for key, value in by_date.items()},
+        "dates": sorted(by_date),
+    }
+
+
+def _schedule_version(fingerprint: str) -> int:
+    digest = hashlib.blake2b(fingerprint.encode("utf-8"), digest_size=6, key=_version_key)
+    return int.from_bytes(digest.digest(), "big")
+
+
 def _get_schedule(group: str) -> dict:
+    return _cached(f"parsed:{group}", lambda: _build_schedule(group))
+
+
+def _build_schedule(group: str) -> dict:
     cached = _cache_get(f"parsed:{group}")
     if cached:
         return cached
-    data = _load_schedule_json(group)
-    entries = _parse_entries(data)
-    meta = _week_meta(entries)
-    has_dates = any(e["date"] for e in entries)
-    payload = {"entries": entries, "meta": meta, "has_dates": has_dates, "raw": data}
-    _cache_set(f"parsed:{group}", payload)
+    entries, fingerprint, items = _fetch_schedule_entries(group)
+    return _store_entries(group, entries, fingerprint, items)
+
+
+def _store_entries(group: str, entries: list[Lesson], fingerprint: str, items: dict) -> dict:
+    key = f"parsed:{group}"
+    version = _schedule_version(fingerprint)
+    previous = _cache_entry(key)
+    if previous is not None and previous.value.get("version") == version:
+        _count_cache("unchanged", key)
+        _cache_touch(key)
+        return previous.value
+    with _timed("index"):
+        meta = _week_meta(entries)
+        has_dates = any(e.date for e in entries)
+        index = _build_index(entries, meta)
+    payload = {
+        "entries": tuple(entries),
+        "meta": meta,
+        "has_dates": has_dates,
+        "index": index,
+        "version": version,
+        "items": items,
+    }
+    _cache_set(key, payload)
+    _notify_version(group, payload["version"])
     return payload
 
 
-def _get_group() -> str:
-    group = request.args.get("group", "").strip()
-    return group or DEFAULT_GROUP
+def _group_value(raw: str | None) -> str:
+    return (raw or "").strip() or DEFAULT_GROUP
 
 
-def _get_week_offset() -> int:
-    raw = request.args.get("week", "").strip()
+def _week_offset_value(raw: str | None) -> int:
+    raw = (raw or "").strip()
     if not raw:
         return 0
     try:
@@ -1081,6 +2428,47 @@ def _get_week_offset() -> int:
         return 0
 
 
+def _get_group() -> str:
+    return _group_value(request.args.get("group"))
+
+
+def _parse_date_arg(args, name: str) -> date | None:
+    raw = (args.get(name) or "").strip()
+    if not raw:
+        return None
+    try:
+        if "." in raw:
+            return datetime.strptime(raw, "%d.%m.%Y").date()
+        return date.fromisoformat(raw)
+    except ValueError as exc:
+        raise ValueError(f"Параметр {name} должен быть датой YYYY-MM-DD.") from exc
+
+
+def _week_range(args, today: date) -> tuple[int, int]:
+    this_monday = today - timedelta(days=today.weekday())
+    start = _parse_date_arg(args, "from")
+    end = _parse_date_arg(args, "to")
+    if start or end:
+        start = start or today
+        end = end or start
+        if end < start:
+            raise ValueError("Параметр to должен быть не раньше from.")
+        first = ((start - timedelta(days=start.weekday())) - this_monday).days // 7
+        last = ((end - timedelta(days=end.weekday())) - this_monday).days // 7
+        count = last - first + 1
+    else:
+        first = _week_offset_value(args.get("week"))
+        try:
+            count = int((args.get("weeks") or "").strip() or "1")
+        except ValueError:
+            count = 1
+    return first, min(max(count, 1), RANGE_MAX_WEEKS)
+
+
+def _get_week_offset() -> int:
+    return _week_offset_value(request.args.get("week"))
+
+
 def _day_label(day_index: int, day_date: date | None = None) -> str:
     names = {
         1: "Понедельник",
@@ -1097,12 +2485,479 @@ def _day_label(day_index: int, day_date: date | None = None) -> str:
     return label
 
 
+def _cyclic_week_indexes(meta: dict, today: date, week_offset: int) -> tuple[int, int]:
+    if meta["cycle"] <= 0:
+        return 0, 0
+    forced = _override_week_index(meta)
+    if forced is not None:
+        return forced, forced
+    linear_now = _linear_week_number(today, 0)
+    linear_view = _linear_week_number(today, week_offset)
+    return (linear_now - 1) % meta["cycle"], (linear_view - 1) % meta["cycle"]
+
+
+def _resolve_view(schedule: dict, today: date, week_offset: int) -> dict:
+    meta = schedule["meta"]
+    reference = today + timedelta(days=week_offset * 7)
+    if schedule["has_dates"]:
+        week_index_now, week_index = 0, 0
+        now_label = ""
+    else:
+        week_index_now, week_index = _cyclic_week_indexes(meta, today, week_offset)
+        now_label = meta["labels"][week_index_now]
+    return {
+        "today": today,
+        "reference": reference,
+        "monday": reference - timedelta(days=reference.weekday()),
+        "week_index": week_index,
+        "week_label_now": now_label,
+        "week_number": _linear_week_number(today, week_offset),
+    }
+
+
+def _view_header(group: str, schedule: dict, resolved: dict, view_label: str) -> dict:
+    return {
+        "group": group,
+        "week_label_now": resolved["week_label_now"],
+        "week_label_view": view_label,
+        "week_index": resolved["week_index"],
+        "week_number": resolved["week_number"],
+        "week_cycle": schedule["meta"]["cycle"],
+        "version": schedule["version"],
+    }
+
+
+def _today_part(schedule: dict, resolved: dict) -> tuple[str, str, list[dict]]:
+    index = schedule["index"]
+    if schedule["has_dates"]:
+        target_date = resolved["reference"]
+        return (
+            target_date.strftime("%d.%m"),
+            _day_label(target_date.isoweekday(), target_date),
+            _format_lessons(index["by_date"].get(target_date, ())),
+        )
+    today = resolved["today"]
+    week_index = resolved["week_index"]
+    return (
+        schedule["meta"]["labels"][week_index],
+        _day_label(today.isoweekday(), today),
+        _format_lessons(index["by_week_day"].get((week_index, today.isoweekday()), ())),
+    )
+
+
+def _week_part(schedule: dict, resolved: dict) -> tuple[str, list[dict]]:
+    index = schedule["index"]
+    monday = resolved["monday"]
+    days = []
+    for day_index in range(1, 7):
+        day_date = monday + timedelta(days=day_index - 1)
+        if schedule["has_dates"]:
+            lessons = index["by_date"].get(day_date, ())
+        else:
+            lessons = index["by_week_day"].get((resolved["week_index"], day_index), ())
+        days.append(
+            {"label": _day_label(day_index, day_date), "lessons": _format_lessons(lessons)}
+        )
+    if schedule["has_dates"]:
+        view_label = f"{monday.strftime('%d.%m')}–{(monday + timedelta(days=6)).strftime('%d.%m')}"
+    else:
+        view_label = schedule["meta"]["labels"][resolved["week_index"]]
+    return view_label, days
+
+
+def _today_view(group: str, schedule: dict, today: date, week_offset: int) -> dict:
+    resolved = _resolve_view(schedule, today, week_offset)
+    view_label, today_label, lessons = _today_part(schedule, resolved)
+    return {
+        **_view_header(group, schedule, resolved, view_label),
+        "today_label": today_label,
+        "lessons": lessons,
+    }
+
+
+def _week_view(group: str, schedule: dict, today: date, week_offset: int) -> dict:
+    resolved = _resolve_view(schedule, today, week_offset)
+    view_label, days = _week_part(schedule, resolved)
+    return {**_view_header(group, schedule, resolved, view_label), "days": days}
+
+
+def _bundle_view(group: str, schedule: dict, today: date, week_offset: int) -> dict:
+    resolved = _resolve_view(schedule, today, week_offset)
+    _, today_label, lessons = _today_part(schedule, resolved)
+    view_label, days = _week_part(schedule, resolved)
+    return {
+        **_view_header(group, schedule, resolved, view_label),
+        "today_label": today_label,
+        "lessons": lessons,
+        "days": days,
+    }
+
+
+def _range_week(schedule: dict, today: date, week_offset: int) -> dict:
+    resolved = _resolve_view(schedule, today, week_offset)
+    view_label, days = _week_part(schedule, resolved)
+    return {
+        "monday": resolved["monday"].isoformat(),
+        "week_number": resolved["week_number"],
+        "week_index": resolved["week_index"],
+        "week_label_view": view_label,
+        "days": days,
+    }
+
+
+def _range_key(group: str, schedule: dict, today: date, first: int, count: int) -> str:
+    return f"range:{group}:{schedule['version']}:{today.isoformat()}:{first}:{count}"
+
+
+def _iter_range_json(group: str, schedule: dict, today: date, first: int, count: int):
+    head = {
+        "ok": True,
+        "group": group,
+        "week_cycle": schedule["meta"]["cycle"],
+        "version": schedule["version"],
+    }
+    yield app.json.dumps(head, separators=(",", ":"))[:-1] + ',"weeks":['
+    for number, week_offset in enumerate(range(first, first + count)):
+        week = app.json.dumps(
+            _range_week(schedule, today, week_offset), separators=(",", ":")
+        )
+        yield week if number == 0 else "," + week
+    yield "]}\n"
+
+
+def _precompressed(body: bytes, etag: str) -> CachedResponse:
+    cached = CachedResponse(body=body, etag=etag)
+    if len(body) < COMPRESS_MIN_BYTES:
+        return cached
+    if brotli is not None:
+        cached.encodings["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    cached.encodings["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return cached
+
+
+def _accepted_encodings(header: str | None) -> dict[str, float]:
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def _select_variant(cached: CachedResponse, accept_encoding: str | None):
+    accepted = _accepted_encodings(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in cached.encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    if best is None:
+        return cached.body, cached.etag, None
+    return cached.encodings[best], f"{cached.etag}-{best}", best
+
+
+def _ics_escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _ics_fold(line: str) -> str:
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    current = ""
+    size = 0
+    limit = 75
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > limit:
+            parts.append(current)
+            current, size, limit = "", 0, 74
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_stamp(moment: datetime) -> str:
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _ics_event(group: str, day: date, entry: Lesson, stamp: str) -> str | None:
+    try:
+        start = datetime.combine(day, datetime.strptime(entry.start, "%H:%M").time())
+    except ValueError:
+        return None
+    try:
+        end = datetime.combine(day, datetime.strptime(entry.end, "%H:%M").time())
+    except ValueError:
+        end = start + timedelta(minutes=LESSON_MINUTES)
+    offset = timedelta(hours=TIMEZONE_OFFSET)
+    uid_source = f"{group}|{day.isoformat()}|{entry.lesson_number}|{entry.start}|{entry.subject}"
+    uid = hashlib.blake2b(uid_source.encode("utf-8"), digest_size=12).hexdigest()
+    summary = entry.subject
+    if entry.type:
+        summary = f"{summary} ({entry.type})"
+    description = entry.teacher
+    if entry.lesson_number:
+        description = f"{entry.lesson_number} пара\n{description}".strip()
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}@miet-schedule",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{_ics_stamp(start - offset)}",
+        f"DTEND:{_ics_stamp(end - offset)}",
+        f"SUMMARY:{_ics_escape(summary)}",
+    ]
+    if entry.room:
+        lines.append(f"LOCATION:{_ics_escape(entry.room)}")
+    if description:
+        lines.append(f"DESCRIPTION:{_ics_escape(description)}")
+    lines.append("END:VEVENT")
+    return "".join(_ics_fold(line) for line in lines)
+
+
+def _ics_days(schedule: dict):
+    index = schedule["index"]
+    if schedule["has_dates"]:
+        for day in index["dates"]:
+            yield day, index["by_date"][day]
+        return
+    start = _week_start_date()
+    base_monday = start - timedelta(days=start.weekday())
+    for week in range(SEMESTER_WEEKS):
+        monday = base_monday + timedelta(days=week * 7)
+        _, week_index = _cyclic_week_indexes(schedule["meta"], monday, 0)
+        for day_index in range(1, 8):
+            lessons = index["by_week_day"].get((week_index, day_index))
+            if lessons:
+                yield monday + timedelta(days=day_index - 1), lessons
+
+
+def _iter_ics(group: str, schedule: dict):
+    stamp = _ics_stamp(datetime.combine(_week_start_date(), datetime.min.time()))
+    head = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//miet-schedule//RU",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_ics_escape(f'МИЭТ {group}')}",
+    ]
+    yield "".join(_ics_fold(line) for line in head)
+    written = 0
+    skipped = []
+    for day, lessons in _ics_days(schedule):
+        events = []
+        for entry in lessons:
+            event = _ics_event(group, day, entry, stamp)
+            if event is None:
+                skipped.append(entry.start)
+            else:
+                events.append(event)
+        written += len(events)
+        yield "".join(events)
+    with _stats_lock:
+        _ics_stats["written"] += written
+        _ics_stats["skipped"] += len(skipped)
+    if skipped:
+        app.logger.warning(
+            "В календарь %s не попали занятия без времени начала: %s (например, %r)",
+            group,
+            len(skipped),
+            skipped[0],
+        )
+    yield "END:VCALENDAR\r\n"
+
+
+def _ics_key(group: str, schedule: dict) -> str:
+    return f"ics:{group}:{schedule['version']}:{SEMESTER_WEEKS}:{WEEK_START_STR}"
+
+
+def _iter_stored(key: str, etag: str, chunks):
+    parts = []
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        parts.append(data)
+        yield data
+    cached = _precompressed(b"".join(parts), etag)
+    _response_cache.set(key, CacheEntry(ts=time.time(), value=cached, size=cached.size))
+
+
+def _encode_json(payload: dict) -> bytes:
+    return app.json.response(payload).get_data()
+
+
+def _make_etag(version: int, key: str) -> str:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+    return f"v{version}-{digest}"
+
+
+def _seconds_until_midnight() -> int:
+    now = _now_local()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(int((midnight - now).total_seconds()), 1)
+
+
+def _api_cache_control() -> str:
+    remaining = _seconds_until_midnight()
+    ttl = min(CACHE_TTL_SECONDS, remaining)
+    value = f"public, max-age={min(BROWSER_MAX_AGE, ttl)}, s-maxage={ttl}"
+    stale = min(CACHE_MAX_STALE_SECONDS, remaining - ttl)
+    if CACHE_SWR and stale > 0:
+        value += f", stale-while-revalidate={stale}"
+    return value
+
+
+def _conditional_response(cached: CachedResponse, mimetype: str, cache_control: str):
+    body, etag, encoding = _select_variant(cached, request.headers.get("Accept-Encoding"))
+    resp = app.response_class(body, mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = cache_control
+    if cached.encodings:
+        resp.vary.add("Accept-Encoding")
+    if encoding:
+        resp.content_encoding = encoding
+    return resp.make_conditional(request)
+
+
+def _page_cache_control() -> str:
+    return f"public, max-age=0, s-maxage={PAGE_CDN_MAX_AGE}"
+
+
+_SERVICE_WORKER = _precompressed(
+    SERVICE_WORKER_JS.encode("utf-8"),
+    hashlib.blake2b(SERVICE_WORKER_JS.encode("utf-8"), digest_size=8).hexdigest(),
+)
+_INITIAL_DATA_EMPTY = b'<script id="initial-data" type="application/json">null</script>'
+
+
+def _render_index_page() -> CachedResponse:
+    global _index_page
+    if _index_page is None:
+        html = render_template_string(
+            INDEX_HTML,
+            group=DEFAULT_GROUP,
+            tz_offset=TIMEZONE_OFFSET,
+        ).encode("utf-8")
+        etag = hashlib.blake2b(html, digest_size=8).hexdigest()
+        _index_page = _precompressed(html, etag)
+    return _index_page
+
+
+def _peek_schedule(group: str) -> dict | None:
+    return _cached(f"parsed:{group}", lambda: _build_schedule(group), wait=False)
+
+
+def _index_response(schedule: dict | None) -> tuple[CachedResponse, str]:
+    page = _render_index_page()
+    if not INLINE_INITIAL:
+        return page, _page_cache_control()
+    if schedule is None:
+        return page, "no-cache"
+    bundle = _cached_response(
+        "bundle", DEFAULT_GROUP, schedule, _now_local().date(), 0, _bundle_view
+    )
+    key = f"page:{page.etag}:{bundle.etag}"
+    entry = _response_cache.get(key)
+    if entry is None:
+        data = bundle.body.strip().replace(b"<", b"\\u003c")
+        body = page.body.replace(
+            _INITIAL_DATA_EMPTY, _INITIAL_DATA_EMPTY.replace(b">null<", b">" + data + b"<"), 1
+        )
+        cached = _precompressed(body, f"{page.etag}-{bundle.etag}")
+        entry = CacheEntry(ts=time.time(), value=cached, size=cached.size)
+        _response_cache.set(key, entry)
+    return entry.value, _api_cache_control()
+
+
+def _json_body_response(cached: CachedResponse):
+    return _conditional_response(cached, app.json.mimetype, _api_cache_control())
+
+
+def _view_key(today: date, week_offset: int) -> str:
+    reference = today + timedelta(days=week_offset * 7)
+    return f"{reference.isoformat()}:{_linear_week_number(today, week_offset)}"
+
+
+def _cached_response(
+    endpoint: str, group: str, schedule: dict, today: date, week_offset: int, build
+) -> CachedResponse:
+    key = (
+        f"{endpoint}:{group}:{schedule['version']}:"
+        f"{today.isoformat()}:{_view_key(today, week_offset)}"
+    )
+    entry = _response_cache.get(key)
+    if entry is not None:
+        _count_cache("response_hit", key)
+        return entry.value
+    _count_cache("response_miss", key)
+    with _timed("view"):
+        payload = build(group, schedule, today, week_offset)
+    with _timed("encode"):
+        body = _encode_json({"ok": True, **payload})
+    with _timed("compress"):
+        cached = _precompressed(body, _make_etag(schedule["version"], key))
+    _response_cache.set(key, CacheEntry(ts=time.time(), value=cached, size=cached.size))
+    return cached
+
+
+@app.before_request
+def _start_request_timing():
+    endpoint = request.url_rule.rule if request.url_rule is not None else "other"
+    _request_timing.set(RequestTiming(endpoint=endpoint))
+
+
+@app.after_request
+def _finish_request_timing(response):
+    timing = _request_timing.get()
+    if timing is not None:
+        response.headers["Server-Timing"] = timing.header()
+        _observe("total", time.perf_counter() - timing.started)
+        _request_timing.set(None)
+    return response
+
+
+@app.after_request
+def _no_store_api_errors(response):
+    if request.path.startswith("/api/") and "Cache-Control" not in response.headers:
+        response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 @app.get("/")
 def index():
-    return render_template_string(
-        INDEX_HTML,
-        group=DEFAULT_GROUP,
-    )
+    schedule = _peek_schedule(DEFAULT_GROUP) if INLINE_INITIAL else None
+    page, cache_control = _index_response(schedule)
+    return _conditional_response(page, "text/html", cache_control)
+
+
+@app.get("/sw.js")
+def service_worker():
+    return _conditional_response(_SERVICE_WORKER, "text/javascript", "no-cache")
+
+
+@app.get("/metrics")
+def metrics():
+    resp = app.response_class(_render_metrics(), mimetype="text/plain")
+    resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
 
 
 @app.get("/api/today")
@@ -1115,64 +2970,10 @@ def api_today():
         )
     try:
         schedule = _get_schedule(group)
-        entries = schedule["entries"]
-        meta = schedule["meta"]
-        today = _now_local().date()
-        week_offset = _get_week_offset()
-        if schedule["has_dates"]:
-            target_date = today + timedelta(days=week_offset * 7)
-            lessons = [e for e in entries if e["date"] == target_date]
-            now_label = ""
-            view_label = target_date.strftime("%d.%m")
-            today_label = _day_label(target_date.isoweekday(), target_date)
-            week_index = 0
-        else:
-            forced = _override_week_index(meta)
-            linear_now = _linear_week_number(today, 0)
-            linear_view = _linear_week_number(today, week_offset)
-            if meta["cycle"] > 0:
-                week_index_now = (
-                    forced if forced is not None else (linear_now - 1) % meta["cycle"]
-                )
-                week_index_view = (
-                    forced if forced is not None else (linear_view - 1) % meta["cycle"]
-                )
-            else:
-                week_index_now = 0
-                week_index_view = 0
-            now_label = meta["labels"][week_index_now]
-            view_label = meta["labels"][week_index_view]
-            day_number = today.isoweekday()
-            lessons = [
-                e
-                for e in entries
-                if e["day"] == day_number
-                and ((e["week"] + meta["shift"]) % meta["cycle"]) == week_index_view
-            ]
-            today_label = _day_label(today.isoweekday(), today)
-            week_index = week_index_view
-            day_number = today.isoweekday()
-            lessons = [
-                e
-                for e in entries
-                if e["day"] == day_number
-                and ((e["week"] + meta["shift"]) % meta["cycle"]) == week_index
-            ]
-        lessons = sorted(
-            lessons,
-            key=lambda x: (x.get("lesson_number") or "", x.get("start") or ""),
-        )
-        return jsonify(
-            ok=True,
-            group=group,
-            week_label_now=now_label,
-            week_label_view=view_label,
-            week_index=week_index,
-            week_number=_linear_week_number(today, week_offset),
-            week_cycle=meta["cycle"],
-            today_label=today_label,
-            lessons=[_format_lesson(e) for e in lessons],
+        cached = _cached_response(
+            "today", group, schedule, _now_local().date(), _get_week_offset(), _today_view
         )
+        return _json_body_response(cached)
     except Exception as exc:
         return jsonify(ok=False, error=str(exc))
 
@@ -1187,86 +2988,102 @@ def api_week():
         )
     try:
         schedule = _get_schedule(group)
-        entries = schedule["entries"]
-        meta = schedule["meta"]
-        today = _now_local().date()
-        week_offset = _get_week_offset()
-        days = []
-        week_label = ""
-        if schedule["has_dates"]:
-            reference = today + timedelta(days=week_offset * 7)
-            monday = reference - timedelta(days=reference.weekday())
-            sunday = monday + timedelta(days=7)
-            week_entries = [
-                e
-                for e in entries
-                if e["date"] and monday <= e["date"] < sunday
-            ]
-            for day_index in range(1, 7):
-                day_date = monday + timedelta(days=day_index - 1)
-                day_lessons = [
-                    e for e in week_entries if e["date"] == day_date
-                ]
-                day_lessons.sort(
-                    key=lambda x: (x.get("lesson_number") or "", x.get("start") or "")
-                )
-                days.append(
-                    {
-                        "label": _day_label(day_index, day_date),
-                        "lessons": [_format_lesson(e) for e in day_lessons],
-                    }
-                )
-            now_label = ""
-            view_label = f"{monday.strftime('%d.%m')}–{(sunday - timedelta(days=1)).strftime('%d.%m')}"
-            week_index = 0
-        else:
-            forced = _override_week_index(meta)
-            linear_now = _linear_week_number(today, 0)
-            linear_view = _linear_week_number(today, week_offset)
-            if meta["cycle"] > 0:
-                week_index_now = (
-                    forced if forced is not None else (linear_now - 1) % meta["cycle"]
-                )
-                week_index_view = (
-                    forced if forced is not None else (linear_view - 1) % meta["cycle"]
-                )
-            else:
-                week_index_now = 0
-                week_index_view = 0
-            now_label = meta["labels"][week_index_now]
-            view_label = meta["labels"][week_index_view]
-            week_index = week_index_view
-            reference = today + timedelta(days=week_offset * 7)
-            monday = reference - timedelta(days=reference.weekday())
-            for day_index in range(1, 7):
-                day_date = monday + timedelta(days=day_index - 1)
-                day_lessons = [
-                    e
-                    for e in entries
-                    if e["day"] == day_index
-                    and ((e["week"] + meta["shift"]) % meta["cycle"]) == week_index_view
-                ]
-                day_lessons.sort(
-                    key=lambda x: (x.get("lesson_number") or "", x.get("start") or "")
-                )
-                days.append(
-                    {
-                        "label": _day_label(day_index, day_date),
-                        "lessons": [_format_lesson(e) for e in day_lessons],
-                    }
-                )
+        cached = _cached_response(
+            "week", group, schedule, _now_local().date(), _get_week_offset(), _week_view
+        )
+        return _json_body_response(cached)
+    except Exception as exc:
+        return jsonify(ok=False, error=str(exc))
+
+
+@app.get("/api/bundle")
+def api_bundle():
+    group = _get_group()
+    if not group:
         return jsonify(
-            ok=True,
-            group=group,
-            week_label_now=now_label,
-            week_label_view=view_label,
-            week_index=week_index,
-            week_number=_linear_week_number(today, week_offset),
-            week_cycle=meta["cycle"],
-            days=days,
+            ok=False,
+            error="Группа не задана. Укажи MIET_GROUP в переменных окружения.",
+        )
+    try:
+        schedule = _get_schedule(group)
+        cached = _cached_response(
+            "bundle", group, schedule, _now_local().date(), _get_week_offset(), _bundle_view
         )
+        return _json_body_response(cached)
+    except Exception as exc:
+        return jsonify(ok=False, error=str(exc))
+
+
+@app.get("/api/range")
+def api_range():
+    group = _get_group()
+    if not group:
+        return jsonify(
+            ok=False,
+            error="Группа не задана. Укажи MIET_GROUP в переменных окружения.",
+        )
+    try:
+        schedule = _get_schedule(group)
+        today = _now_local().date()
+        first, count = _week_range(request.args, today)
+    except Exception as exc:
+        return jsonify(ok=False, error=str(exc))
+    key = _range_key(group, schedule, today, first, count)
+    resp = app.response_class(
+        stream_with_context(_iter_range_json(group, schedule, today, first, count)),
+        mimetype=app.json.mimetype,
+    )
+    resp.set_etag(_make_etag(schedule["version"], key))
+    resp.headers["Cache-Control"] = _api_cache_control()
+    return resp.make_conditional(request)
+
+
+def _sse_event(event: str, payload: dict, retry: int | None = None) -> bytes:
+    lines = []
+    if retry is not None:
+        lines.append(f"retry: {retry}")
+    if "version" in payload:
+        lines.append(f"id: {payload['version']}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+@app.get("/api/stream")
+def api_stream():
+    group = _get_group()
+    try:
+        schedule = _get_schedule(group)
+    except Exception as exc:
+        event = _sse_event("error", {"group": group, "error": str(exc)}, STREAM_RETRY_MS)
+    else:
+        event = _sse_event(
+            "version", {"group": group, "version": schedule["version"]}, STREAM_RETRY_MS
+        )
+    return app.response_class(event, mimetype="text/event-stream")
+
+
+@app.get("/api/ics")
+def api_ics():
+    group = _get_group()
+    try:
+        schedule = _get_schedule(group)
     except Exception as exc:
         return jsonify(ok=False, error=str(exc))
+    key = _ics_key(group, schedule)
+    entry = _response_cache.get(key)
+    if entry is not None:
+        _count_cache("response_hit", key)
+        return _conditional_response(entry.value, "text/calendar", _api_cache_control())
+    _count_cache("response_miss", key)
+    etag = _make_etag(schedule["version"], key)
+    resp = app.response_class(
+        stream_with_context(_iter_stored(key, etag, _iter_ics(group, schedule))),
+        mimetype="text/calendar",
+    )
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = _api_cache_control()
+    return resp.make_conditional(request)
 
 
 @app.get("/api/debug")
@@ -1281,7 +3098,248 @@ def api_debug():
         return jsonify(ok=False, error=str(exc))
 
 
-if __name__ == "__main__":
+def _read_groups_file(path: str) -> list[str]:
+    with open(path, encoding="utf-8-sig") as fh:
+        return [
+            line.strip()
+            for line in fh
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
+def _configured_warm_groups() -> list[str]:
+    groups = [g.strip() for g in WARM_GROUPS.split(",") if g.strip()]
+    if WARM_GROUPS_FILE:
+        groups += _read_groups_file(WARM_GROUPS_FILE)
+    return groups or [DEFAULT_GROUP]
+
+
+def _warm_group(group: str) -> dict:
+    started = time.perf_counter()
+    try:
+        schedule = _cached(f"parsed:{group}", lambda: _build_schedule(group), allow_stale=False)
+        return {
+            "group": group,
+            "ok": True,
+            "seconds": round(time.perf_counter() - started, 3),
+            "lessons": len(schedule["entries"]),
+        }
+    except Exception as exc:
+        return {
+            "group": group,
+            "ok": False,
+            "seconds": round(time.perf_counter() - started, 3),
+            "error": str(exc),
+        }
+
+
+def warm_cache(groups: list[str], concurrency: int = WARM_CONCURRENCY) -> list[dict]:
+    groups = list(dict.fromkeys(g for g in groups if g))
+    if not groups:
+        return []
+    with ThreadPoolExecutor(
+        max_workers=max(min(concurrency, len(groups)), 1),
+        thread_name_prefix="miet-warm",
+    ) as pool:
+        return list(pool.map(_warm_group, groups))
+
+
+def _warm_token_valid(authorization: str | None, query_token: str | None) -> bool:
+    if not WARM_TOKEN:
+        return False
+    header = authorization or ""
+    token = header[7:].strip() if header.startswith("Bearer ") else query_token or ""
+    return hmac.compare_digest(token.encode("utf-8"), WARM_TOKEN.encode("utf-8"))
+
+
+def _warm_groups(body, query_groups: list[str]) -> list[str]:
+    groups = body.get("groups") if isinstance(body, dict) else None
+    if not isinstance(groups, list):
+        groups = query_groups or _configured_warm_groups()
+    return [str(g).strip() for g in groups]
+
+
+def _warm_report(groups: list[str]) -> dict:
+    started = time.perf_counter()
+    results = warm_cache(groups)
+    return {
+        "ok": all(r["ok"] for r in results),
+        "seconds": round(time.perf_counter() - started, 3),
+        "results": results,
+    }
+
+
+@app.route("/api/warm", methods=["GET", "POST"])
+def api_warm():
+    if not _warm_token_valid(request.headers.get("Authorization"), request.args.get("token")):
+        return jsonify(ok=False, error="Прогрев кэша не разрешён."), 403
+    groups = _warm_groups(request.get_json(silent=True), request.args.getlist("group"))
+    return jsonify(**_warm_report(groups))
+
+
+@app.get("/api/stats")
+def api_stats():
+    return jsonify(
+        ok=True,
+        cache=_cache_stats_snapshot(),
+        upstream=_upstream.stats_snapshot(),
+        cookie=_cookie_jar.stats_snapshot(),
+    )
+
+
+def _run_warm(args: argparse.Namespace) -> int:
+    if _shared_cache is None:
+        print(
+            "Прогрев из командной строки имеет смысл только с общим кэшем: "
+            "запусти с MIET_CACHE_BACKEND=sqlite или вызови /api/warm на сервере."
+        )
+        return 2
+    groups = list(args.groups or [])
+    if args.groups_file:
+        groups += _read_groups_file(args.groups_file)
+    if not groups:
+        groups = _configured_warm_groups()
+    started = time.perf_counter()
+    results = warm_cache(groups, args.concurrency)
+    width = max((len(r["group"]) for r in results), default=0)
+    for result in results:
+        status = "ok" if result["ok"] else f"ошибка: {result['error']}"
+        print(f"{result['group']:<{width}}  {result['seconds']:7.3f}s  {status}")
+    failed = sum(1 for r in results if not r["ok"])
+    print(
+        f"Прогрето {len(results) - failed} из {len(results)} групп "
+        f"за {time.perf_counter() - started:.2f}s."
+    )
+    return 1 if failed else 0
+
+
+def _static_week_mondays(weeks: int) -> list[date]:
+    start = _week_start_date()
+    base_monday = start - timedelta(days=start.weekday())
+    return [base_monday + timedelta(days=week * 7) for week in range(weeks)]
+
+
+def _write_static(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+
+
+def _static_group_allowed(group: str) -> bool:
+    return bool(group) and "/" not in group and "\\" not in group and group not in (".", "..")
+
+
+def _render_static_group(group: str, out_dir: str, weeks: int) -> dict:
+    schedule = _get_schedule(group)
+    base = os.path.join(out_dir, group)
+    mondays = _static_week_mondays(weeks)
+    for number, monday in enumerate(mondays, start=1):
+        payload = {"ok": True, **_week_view(group, schedule, monday, 0)}
+        _write_static(os.path.join(base, "week", f"{number}.json"), _encode_json(payload))
+        for day_offset in range(7):
+            day = monday + timedelta(days=day_offset)
+            payload = {"ok": True, **_today_view(group, schedule, day, 0)}
+            _write_static(
+                os.path.join(base, "today", f"{day.isoformat()}.json"), _encode_json(payload)
+            )
+    return {
+        "version": schedule["version"],
+        "dated": schedule["has_dates"],
+        "first_date": mondays[0].isoformat(),
+        "last_date": (mondays[-1] + timedelta(days=6)).isoformat(),
+    }
+
+
+def build_static(
+    groups: list[str],
+    out_dir: str,
+    weeks: int = SEMESTER_WEEKS,
+    concurrency: int = WARM_CONCURRENCY,
+) -> list[dict]:
+    weeks = max(weeks, 1)
+    results = warm_cache([g for g in groups if _static_group_allowed(g)], concurrency)
+    results += [
+        {
+            "group": group,
+            "ok": False,
+            "seconds": 0.0,
+            "error": "Недопустимое имя группы для статической сборки.",
+        }
+        for group in dict.fromkeys(groups)
+        if group and not _static_group_allowed(group)
+    ]
+    manifest_groups = {}
+    for result in results:
+        if not result["ok"]:
+            continue
+        try:
+            manifest_groups[result["group"]] = _render_static_group(
+                result["group"], out_dir, weeks
+            )
+        except Exception as exc:
+            result.update(ok=False, error=str(exc))
+    manifest = {
+        "generated": _now_local().isoformat(timespec="seconds"),
+        "week_start": _week_start_date().isoformat(),
+        "tz_offset": TIMEZONE_OFFSET,
+        "weeks": weeks,
+        "groups": manifest_groups,
+    }
+    _write_static(os.path.join(out_dir, "manifest.json"), _encode_json(manifest))
+    return results
+
+
+def _run_build_static(args: argparse.Namespace) -> int:
+    groups = list(args.groups or [])
+    if args.groups_file:
+        groups += _read_groups_file(args.groups_file)
+    if not groups:
+        groups = _configured_warm_groups()
+    started = time.perf_counter()
+    results = build_static(groups, args.out, args.weeks, args.concurrency)
+    for result in results:
+        if not result["ok"]:
+            print(f"{result['group']}: ошибка: {result['error']}")
+    failed = sum(1 for r in results if not r["ok"])
+    print(
+        f"Собрано {len(results) - failed} из {len(results)} групп "
+        f"({args.weeks} недель) в {args.out} за {time.perf_counter() - started:.2f}s."
+    )
+    if os.path.abspath(args.out) == os.path.abspath(app.static_folder):
+        print("Закоммитьте каталог static/: Vercel публикует его как есть, без шага сборки.")
+    return 1 if failed else 0
+
+
+def _main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Расписание МИЭТ")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("serve", help="запустить сервер разработки")
+    warm = commands.add_parser("warm", help="прогреть кэш для списка групп")
+    warm.add_argument("--groups-file", help="файл со списком групп, по одной в строке")
+    warm.add_argument("--groups", nargs="*", help="группы через пробел")
+    warm.add_argument("--concurrency", type=int, default=WARM_CONCURRENCY)
+    build = commands.add_parser(
+        "build-static", help="собрать статические JSON-файлы расписания для CDN"
+    )
+    build.add_argument("--groups-file", help="файл со списком групп, по одной в строке")
+    build.add_argument("--groups", nargs="*", help="группы через пробел")
+    build.add_argument("--out", default=app.static_folder, help="каталог для файлов")
+    build.add_argument("--weeks", type=int, default=SEMESTER_WEEKS)
+    build.add_argument("--concurrency", type=int, default=WARM_CONCURRENCY)
+    args = parser.parse_args(argv)
+    if args.command == "warm":
+        return _run_warm(args)
+    if args.command == "build-static":
+        return _run_build_static(args)
     host = os.getenv("MIET_HOST", "127.0.0.1")
     port = int(os.getenv("MIET_PORT", "5000"))
     app.run(host=host, port=port, debug=True)
+    return 0
+
+
+if __name__ == "__main__":
+    import schedule
+
+    sys.exit(schedule._main())
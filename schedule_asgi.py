@@ -0,0 +1,618 @@
+import asyncio
+import contextvars
+import json
+import ssl
+import time
+from dataclasses import dataclass
+from urllib import parse as urlparse
+
+import schedule as core
+
+_ssl_context = ssl.create_default_context()
+
+
+@dataclass
+class AsyncFlight:
+    task: asyncio.Task
+    waiters: int = 0
+    detached: bool = False
+
+
+_inflight: dict[str, AsyncFlight] = {}
+_subscribers: dict[str, set[asyncio.Queue]] = {}
+_watchers: dict[str, asyncio.Task] = {}
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _header(headers: dict, name: str) -> str | None:
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: dict) -> bytes:
+    if (_header(headers, "Transfer-Encoding") or "").lower() == "chunked":
+        chunks = []
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                await reader.readuntil(b"\r\n")
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    length = _header(headers, "Content-Length")
+    if length is not None:
+        return await reader.readexactly(int(length))
+    return await reader.read()
+
+
+async def _request_once(
+    method: str, url: str, body: bytes | None, headers: dict
+) -> tuple[int, str, dict, bytes]:
+    parts = urlparse.urlsplit(url)
+    scheme = parts.scheme or "https"
+    port = parts.port or (443 if scheme == "https" else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(
+            parts.hostname,
+            port,
+            ssl=_ssl_context if scheme == "https" else None,
+        ),
+        core.CONNECT_TIMEOUT,
+    )
+    try:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {parts.netloc}", "Connection: close"]
+        lines += [f"{key}: {value}" for key, value in headers.items()]
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await writer.drain()
+
+        async def read_response() -> tuple[int, str, dict, bytes]:
+            head = await reader.readuntil(b"\r\n\r\n")
+            status_line, *header_lines = head.decode("latin-1").split("\r\n")
+            _, status, *reason = status_line.split(" ", 2)
+            resp_headers = {}
+            for line in header_lines:
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    resp_headers[key.strip()] = value.strip()
+            data = await _read_body(reader, resp_headers)
+            return int(status), (reason[0] if reason else ""), resp_headers, data
+
+        return await asyncio.wait_for(read_response(), core.READ_TIMEOUT)
+    finally:
+        writer.close()
+
+
+async def _request(
+    method: str, url: str, body: bytes | None = None, headers: dict | None = None
+) -> tuple[dict, bytes]:
+    headers = dict(headers or {})
+    for _ in range(4):
+        status, reason, resp_headers, data = await _request_once(method, url, body, headers)
+        location = _header(resp_headers, "Location")
+        if status in (301, 302, 303, 307, 308) and location:
+            url = urlparse.urljoin(url, location)
+            if status in (301, 302, 303):
+                method, body = "GET", None
+                headers.pop("Content-Type", None)
+            continue
+        if status >= 400:
+            raise RuntimeError(f"HTTP Error {status}: {reason}")
+        return resp_headers, data
+    raise RuntimeError("Слишком много перенаправлений от miet.ru.")
+
+
+async def _post_schedule(
+    group: str, cookie: str | None = None, stage: str = "upstream"
+) -> tuple[str, dict]:
+    data, headers = core._schedule_request(group, cookie)
+    try:
+        with core._timed(stage):
+            resp_headers, body = await _request("POST", core.SCHEDULE_DATA_URL, data, headers)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, RuntimeError) as exc:
+        core._count_upstream_error(exc)
+        raise
+    return body.decode("utf-8", errors="ignore"), resp_headers
+
+
+async def _run_exchange(group: str, decode):
+    exchange = core._schedule_exchange(decode)
+    cookie = next(exchange)
+    stage = "upstream"
+    while True:
+        text, headers = await _post_schedule(group, cookie=cookie, stage=stage)
+        try:
+            with core._timed("parse"):
+                cookie = exchange.send(([text], headers))
+        except StopIteration as stop:
+            return stop.value
+        stage = "cookie_retry"
+
+
+async def _cache_io(func, *args):
+    if core._shared_cache is None:
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+async def _fetch_schedule_json(group: str) -> dict:
+    cached = await _cache_io(core._cache_get, f"raw:{group}")
+    if cached:
+        return cached
+    data = await _run_exchange(group, core._decode_document)
+    await _cache_io(core._cache_set, f"raw:{group}", data)
+    return data
+
+
+def _forget(key: str, task: asyncio.Task) -> None:
+    flight = _inflight.get(key)
+    if flight is not None and flight.task is task:
+        _inflight.pop(key, None)
+    if not task.cancelled() and task.exception() is not None and flight and flight.detached:
+        core._count_cache("refresh_errors")
+        core.app.logger.warning("Не удалось обновить %s в фоне: %s", key, task.exception())
+
+
+def _start_flight(key: str, factory, detached: bool = False) -> AsyncFlight:
+    flight = _inflight.get(key)
+    if flight is None:
+        context = contextvars.Context() if detached else None
+        task = asyncio.get_running_loop().create_task(factory(), context=context)
+        flight = AsyncFlight(task=task)
+        _inflight[key] = flight
+        task.add_done_callback(lambda done: _forget(key, done))
+    if detached:
+        flight.detached = True
+    return flight
+
+
+async def _single_flight(key: str, factory):
+    flight = _start_flight(key, factory)
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task)
+    except asyncio.CancelledError:
+        if flight.waiters == 1 and not flight.detached and not flight.task.done():
+            flight.task.cancel()
+        raise
+    finally:
+        flight.waiters -= 1
+
+
+async def _cached(key: str, factory, wait: bool = True):
+    value, state = await _cache_io(core._cache_lookup, key)
+    core._count_cache(state, key)
+    if state == "hit":
+        return value
+    if state == "stale" or not wait:
+        _start_flight(key, factory, detached=True)
+        return value
+    return await _single_flight(key, factory)
+
+
+async def _load_schedule_json(group: str) -> dict:
+    return await _cached(f"raw:{group}", lambda: _fetch_schedule_json(group))
+
+
+async def _build_schedule(group: str) -> dict:
+    cached = await _cache_io(core._cache_get, f"parsed:{group}")
+    if cached:
+        return cached
+    previous = await _cache_io(core._cache_entry, f"parsed:{group}")
+    decode, fingerprint, items = core._entries_decoder(previous)
+    entries = await _run_exchange(group, decode)
+    return await _cache_io(core._store_entries, group, entries, fingerprint[0], items)
+
+
+async def get_schedule(group: str) -> dict:
+    return await _cached(f"parsed:{group}", lambda: _build_schedule(group))
+
+
+def _publish(group: str, version: int) -> None:
+    for queue in _subscribers.get(group, ()):
+        queue.put_nowait(version)
+
+
+def _on_version(group: str, version: int) -> None:
+    if _loop is not None and not _loop.is_closed():
+        _loop.call_soon_threadsafe(_publish, group, version)
+
+
+async def _watch(group: str) -> None:
+    while _subscribers.get(group):
+        try:
+            await get_schedule(group)
+        except Exception as exc:
+            core.app.logger.warning("Не удалось обновить %s для подписчиков: %s", group, exc)
+        await asyncio.sleep(max(core.CACHE_TTL_SECONDS, 1))
+    _watchers.pop(group, None)
+
+
+def _subscribe(group: str) -> asyncio.Queue:
+    global _loop
+    if _loop is None:
+        _loop = asyncio.get_running_loop()
+        core._version_listeners.append(_on_version)
+    queue: asyncio.Queue = asyncio.Queue()
+    _subscribers.setdefault(group, set()).add(queue)
+    if group not in _watchers:
+        _watchers[group] = _loop.create_task(_watch(group))
+    return queue
+
+
+def _unsubscribe(group: str, queue: asyncio.Queue) -> None:
+    queues = _subscribers.get(group)
+    if queues is None:
+        return
+    queues.discard(queue)
+    if not queues:
+        _subscribers.pop(group, None)
+        watcher = _watchers.pop(group, None)
+        if watcher is not None:
+            watcher.cancel()
+
+
+async def _wait_disconnect(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _stream(receive, send, group: str, head_only: bool) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-store"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+    if head_only:
+        await send({"type": "http.response.body", "body": b""})
+        return
+    queue = _subscribe(group)
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        try:
+            version = (await get_schedule(group))["version"]
+            event = core._sse_event("version", {"group": group, "version": version})
+        except Exception as exc:
+            version = 0
+            event = core._sse_event("error", {"group": group, "error": str(exc)})
+        await send({"type": "http.response.body", "body": event, "more_body": True})
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnected},
+                timeout=core.STREAM_HEARTBEAT_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected in done:
+                getter.cancel()
+                return
+            if getter not in done:
+                getter.cancel()
+                await send({"type": "http.response.body", "body": b": ping\n\n", "more_body": True})
+                continue
+            latest = getter.result()
+            if latest == version:
+                continue
+            version = latest
+            event = core._sse_event("version", {"group": group, "version": version})
+            await send({"type": "http.response.body", "body": event, "more_body": True})
+    finally:
+        disconnected.cancel()
+        _unsubscribe(group, queue)
+
+
+def _etag_matches(headers: dict, etag: str) -> bool:
+    value = headers.get("if-none-match")
+    if not value:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in value.split(",")}
+    return "*" in candidates or f'"{etag}"' in candidates
+
+
+async def _send(send, status: int, body: bytes, headers: list[tuple[str, str]]) -> None:
+    timing = core._request_timing.get()
+    if timing is not None:
+        headers = headers + [("Server-Timing", timing.header())]
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_cached(
+    send, request_headers: dict, cached, content_type: str, cache_control: str
+) -> None:
+    body, etag, encoding = core._select_variant(cached, request_headers.get("accept-encoding"))
+    headers = [("ETag", f'"{etag}"'), ("Cache-Control", cache_control)]
+    if cached.encodings:
+        headers.append(("Vary", "Accept-Encoding"))
+    if _etag_matches(request_headers, etag):
+        await _send(send, 304, b"", headers)
+        return
+    if encoding:
+        headers.append(("Content-Encoding", encoding))
+    headers += [("Content-Type", content_type), ("Content-Length", str(len(body)))]
+    await _send(send, 200, body, headers)
+
+
+async def _send_json(send, payload: dict, status: int = 200) -> None:
+    body = core._encode_json(payload)
+    await _send(
+        send,
+        status,
+        body,
+        [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(body))),
+            ("Cache-Control", "no-store"),
+        ],
+    )
+
+
+async def _send_ics(send, request_headers: dict, group: str, schedule: dict) -> None:
+    key = core._ics_key(group, schedule)
+    entry = core._response_cache.get(key)
+    if entry is not None:
+        core._count_cache("response_hit", key)
+        await _send_cached(
+            send,
+            request_headers,
+            entry.value,
+            "text/calendar; charset=utf-8",
+            core._api_cache_control(),
+        )
+        return
+    core._count_cache("response_miss", key)
+    etag = core._make_etag(schedule["version"], key)
+    headers = [("ETag", f'"{etag}"'), ("Cache-Control", core._api_cache_control())]
+    if _etag_matches(request_headers, etag):
+        await _send(send, 304, b"", headers)
+        return
+    headers.append(("Content-Type", "text/calendar; charset=utf-8"))
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        }
+    )
+    for chunk in core._iter_stored(key, etag, core._iter_ics(group, schedule)):
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _send_range(
+    send, request_headers: dict, group: str, schedule: dict, today, first: int, count: int
+) -> None:
+    etag = core._make_etag(schedule["version"], core._range_key(group, schedule, today, first, count))
+    headers = [("ETag", f'"{etag}"'), ("Cache-Control", core._api_cache_control())]
+    if _etag_matches(request_headers, etag):
+        await _send(send, 304, b"", headers)
+        return
+    headers.append(("Content-Type", "application/json"))
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        }
+    )
+    for chunk in core._iter_range_json(group, schedule, today, first, count):
+        await send(
+            {"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True}
+        )
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _receive_body(receive) -> bytes:
+    parts = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        parts.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(parts)
+
+
+async def _warm(receive, send, query: dict, request_headers: dict, method: str) -> None:
+    token = (query.get("token") or [None])[0]
+    if not core._warm_token_valid(request_headers.get("authorization"), token):
+        await _send_json(send, {"ok": False, "error": "Прогрев кэша не разрешён."}, 403)
+        return
+    body = None
+    if method == "POST":
+        try:
+            body = json.loads(await _receive_body(receive) or b"null")
+        except ValueError:
+            body = None
+    groups = core._warm_groups(body, query.get("group", []))
+    await _send_json(send, await asyncio.to_thread(core._warm_report, groups))
+
+
+_ROUTES = {
+    "/",
+    "/sw.js",
+    "/metrics",
+    "/api/today",
+    "/api/week",
+    "/api/bundle",
+    "/api/range",
+    "/api/ics",
+    "/api/warm",
+    "/api/stream",
+    "/api/debug",
+    "/api/stats",
+}
+
+_VIEWS = {
+    "/api/today": ("today", core._today_view),
+    "/api/week": ("week", core._week_view),
+    "/api/bundle": ("bundle", core._bundle_view),
+}
+
+
+async def _handle(scope, receive, send) -> None:
+    path = scope["path"]
+    query = urlparse.parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    args = {key: values[0] for key, values in query.items()}
+    request_headers = {
+        key.decode("latin-1").lower(): value.decode("latin-1")
+        for key, value in scope.get("headers", [])
+    }
+    if path == "/api/warm" and scope["method"] in ("GET", "POST"):
+        await _warm(receive, send, query, request_headers, scope["method"])
+        return
+    if scope["method"] not in ("GET", "HEAD"):
+        await _send_json(send, {"ok": False, "error": "Метод не поддерживается."}, 405)
+        return
+    if path == "/":
+        schedule = None
+        if core.INLINE_INITIAL:
+            schedule = await _cached(
+                f"parsed:{core.DEFAULT_GROUP}",
+                lambda: _build_schedule(core.DEFAULT_GROUP),
+                wait=False,
+            )
+        with core.app.app_context():
+            page, cache_control = core._index_response(schedule)
+        await _send_cached(send, request_headers, page, "text/html; charset=utf-8", cache_control)
+        return
+    if path == "/sw.js":
+        await _send_cached(
+            send,
+            request_headers,
+            core._SERVICE_WORKER,
+            "text/javascript; charset=utf-8",
+            "no-cache",
+        )
+        return
+    group = core._group_value(args.get("group"))
+    if path == "/api/stream":
+        await _stream(receive, send, group, scope["method"] == "HEAD")
+        return
+    if path in _VIEWS:
+        endpoint, build = _VIEWS[path]
+        try:
+            schedule = await get_schedule(group)
+            cached = core._cached_response(
+                endpoint,
+                group,
+                schedule,
+                core._now_local().date(),
+                core._week_offset_value(args.get("week")),
+                build,
+            )
+        except Exception as exc:
+            await _send_json(send, {"ok": False, "error": str(exc)})
+            return
+        await _send_cached(
+            send, request_headers, cached, "application/json", core._api_cache_control()
+        )
+        return
+    if path == "/api/range":
+        try:
+            schedule = await get_schedule(group)
+            today = core._now_local().date()
+            first, count = core._week_range(args, today)
+        except Exception as exc:
+            await _send_json(send, {"ok": False, "error": str(exc)})
+            return
+        await _send_range(send, request_headers, group, schedule, today, first, count)
+        return
+    if path == "/api/ics":
+        try:
+            schedule = await get_schedule(group)
+        except Exception as exc:
+            await _send_json(send, {"ok": False, "error": str(exc)})
+            return
+        await _send_ics(send, request_headers, group, schedule)
+        return
+    if path == "/api/debug":
+        try:
+            data = await _load_schedule_json(group)
+        except Exception as exc:
+            await _send_json(send, {"ok": False, "error": str(exc)})
+            return
+        await _send_json(send, {"ok": True, "raw": data})
+        return
+    if path == "/metrics":
+        body = core._render_metrics().encode("utf-8")
+        await _send(
+            send,
+            200,
+            body,
+            [
+                ("Content-Type", "text/plain; version=0.0.4; charset=utf-8"),
+                ("Content-Length", str(len(body))),
+                ("Cache-Control", "no-store"),
+            ],
+        )
+        return
+    if path == "/api/stats":
+        await _send_json(
+            send,
+            {
+                "ok": True,
+                "cache": core._cache_stats_snapshot(),
+                "cookie": core._cookie_jar.stats_snapshot(),
+                "inflight": len(_inflight),
+                "subscribers": sum(len(queues) for queues in _subscribers.values()),
+            },
+        )
+        return
+    await _send_json(send, {"ok": False, "error": "Не найдено."}, 404)
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    endpoint = scope["path"] if scope["path"] in _ROUTES else "other"
+    timing = core.RequestTiming(endpoint=endpoint)
+    token = core._request_timing.set(timing)
+    try:
+        if scope["method"] == "HEAD":
+
+            async def send_headers_only(message) -> None:
+                if message["type"] == "http.response.body":
+                    message = {**message, "body": b""}
+                await send(message)
+
+            await _handle(scope, receive, send_headers_only)
+        else:
+            await _handle(scope, receive, send)
+    finally:
+        core._observe("total", time.perf_counter() - timing.started)
+        core._request_timing.reset(token)
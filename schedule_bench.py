@@ -0,0 +1,204 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+from urllib import parse as urlparse
+
+import schedule as core
+import schedule_upstream as upstream
+
+SIZES = (100, 1000, 5000)
+BENCH_TODAY = date(2026, 3, 4)
+
+
+def _chunks(text: str, size: int = core.UPSTREAM_CHUNK_SIZE):
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+def _clear_caches() -> None:
+    core._cache.sweep(-1)
+    core._response_cache.sweep(-1)
+    if core._shared_cache is not None:
+        core._shared_cache.sweep(-1)
+
+
+def _measure(func, repeat: int, setup=None) -> dict:
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {
+        "min_ms": round(min(timings) * 1000, 4),
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "runs": repeat,
+    }
+
+
+def _calibrate(repeat: int) -> float:
+    return _measure(lambda: sum(i * i for i in range(50_000)), max(repeat, 5))["min_ms"]
+
+
+def _stage_cases(text: str, dated: bool) -> dict:
+    data = json.loads(text)
+    known: dict = {}
+    core._decode_entries(_chunks(text), None, known)
+    entries = core._parse_entries(data)
+    meta = core._week_meta(entries)
+    time_values = [item["Time"]["TimeFrom"] for item in data["Data"]]
+    date_values = [item.get("Date") for item in data["Data"]]
+    unparsed = [value for value in time_values if ":" not in core._extract_time(value)]
+    if unparsed:
+        raise RuntimeError(f"Время занятий не разобрано, например {unparsed[0]!r}.")
+    schedule = {
+        "entries": tuple(entries),
+        "meta": meta,
+        "has_dates": dated,
+        "index": core._build_index(entries, meta),
+        "version": 1,
+    }
+    week = {"ok": True, **core._week_view("BENCH", schedule, BENCH_TODAY, 0)}
+    body = core._encode_json(week)
+    return {
+        "json_loads": lambda: json.loads(text),
+        "decode_entries": lambda: core._decode_entries(_chunks(text)),
+        "decode_entries_known": lambda: core._decode_entries(_chunks(text), known),
+        "parse_entries": lambda: core._parse_entries(data),
+        "extract_time": lambda: [core._extract_time(value) for value in time_values],
+        "extract_date_value": lambda: [core._extract_date_value(value) for value in date_values],
+        "week_meta": lambda: core._week_meta(entries),
+        "build_index": lambda: core._build_index(entries, meta),
+        "week_view": lambda: core._week_view("BENCH", schedule, BENCH_TODAY, 0),
+        "encode_json": lambda: core._encode_json(week),
+        "precompress": lambda: core._precompressed(body, "bench"),
+    }
+
+
+def _request_cases(client, group: str) -> dict:
+    url = f"/api/week?group={urlparse.quote(group)}"
+
+    def get() -> None:
+        resp = client.get(url)
+        if resp.status_code != 200 or not resp.get_json().get("ok"):
+            raise RuntimeError(f"Запрос {url} завершился ошибкой.")
+
+    return {
+        "request_cold": (get, _clear_caches),
+        "request_parsed_hit": (get, lambda: core._response_cache.sweep(-1)),
+        "request_warm": (get, None),
+    }
+
+
+def run(sizes=SIZES, repeat: int = 20, only: str | None = None, latency: float = 0.0) -> dict:
+    payloads = {}
+    texts = {}
+    for lessons in sizes:
+        for dated in (False, True):
+            case = f"{'dated' if dated else 'cyclic'}-{lessons}"
+            payload = upstream.make_payload(lessons, dated)
+            texts[case] = json.dumps(payload, ensure_ascii=False)
+            payloads[f"BENCH-{case}"] = upstream.encode_payload(payload)
+    server, core.SCHEDULE_DATA_URL = upstream.start(
+        upstream.UpstreamConfig(payloads=payloads, challenge=False, latency=latency / 1000)
+    )
+    client = core.app.test_client()
+    results = {}
+    try:
+        for case, text in texts.items():
+            stages = {}
+            cases = {
+                name: (func, None)
+                for name, func in _stage_cases(text, case.startswith("dated")).items()
+            }
+            cases.update(_request_cases(client, f"BENCH-{case}"))
+            for name, (func, setup) in cases.items():
+                if only and only not in name:
+                    continue
+                stages[name] = _measure(func, repeat, setup)
+            results[case] = {"bytes": len(text.encode("utf-8")), "stages": stages}
+    finally:
+        server.shutdown()
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _report(results: dict, calibration: float, baseline: dict | None, threshold: float) -> int:
+    regressions = 0
+    previous = (baseline or {}).get("results", {})
+    scale = 1.0
+    if baseline and baseline.get("calibration_ms"):
+        scale = baseline["calibration_ms"] / calibration
+        print(f"Калибровка: {calibration:.3f} ms, в базовом прогоне {baseline['calibration_ms']:.3f} ms")
+    for case, result in results.items():
+        print(f"{case} ({result['bytes'] / 1024:.0f} KiB)")
+        for name, stats in result["stages"].items():
+            line = f"  {name:<20} {stats['min_ms']:>10.3f} ms  (медиана {stats['median_ms']:.3f})"
+            old = previous.get(case, {}).get("stages", {}).get(name)
+            if old and old["min_ms"] > 0:
+                change = stats["min_ms"] * scale / old["min_ms"] - 1
+                line += f"  {change:+.1%}"
+                if change > threshold:
+                    line += "  РЕГРЕССИЯ"
+                    regressions += 1
+            print(line)
+    return regressions
+
+
+def _main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки разбора и представлений расписания")
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", help="запускать только этапы, содержащие подстроку")
+    parser.add_argument("--baseline", help="JSON-файл с прошлыми результатами для сравнения")
+    parser.add_argument("--save", help="сохранить результаты в JSON-файл")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка источника, мс")
+    args = parser.parse_args(argv)
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding="utf-8") as fh:
+                baseline = json.load(fh)
+        except FileNotFoundError:
+            print(f"Базовый файл {args.baseline} не найден, сравнение пропущено.")
+    calibration = _calibrate(args.repeat)
+    results = run(args.sizes, max(args.repeat, 1), args.only, args.latency)
+    regressions = _report(results, calibration, baseline, args.threshold)
+    if args.save:
+        document = {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "repeat": args.repeat,
+            "calibration_ms": calibration,
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(document, fh, ensure_ascii=False, indent=2)
+            fh.write("\n")
+    if regressions:
+        print(f"Замедлилось этапов: {regressions} (порог {args.threshold:.0%}).")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
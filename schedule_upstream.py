@@ -0,0 +1,356 @@
+import argparse
+import json
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import parse as urlparse
+
+import schedule as core
+
+DATA_PATH = "/schedule/data"
+STATS_PATH = "/__upstream/stats"
+BOM = "\ufeff".encode("utf-8")
+SEMESTER_WEEKS = 18
+SUBJECTS = (
+    "Математический анализ",
+    "Линейная алгебра и аналитическая геометрия",
+    "Физика",
+    "Программирование на языке высокого уровня",
+    "Иностранный язык",
+    "Теория вероятностей и математическая статистика",
+    "Проектирование цифровых интегральных схем",
+    "Финансовая грамотность в условиях цифровой экономики",
+)
+TYPES = ("Лек", "Пр", "Лаб")
+TEACHERS = (
+    "Иванов Иван Иванович",
+    "Петрова Мария Сергеевна",
+    "Сидоров Алексей Викторович",
+    "Кузнецова Елена Андреевна",
+    "Смирнов Дмитрий Олегович",
+)
+ROOMS = ("3101", "3217", "4302а", "1206", "Виртуальная аудитория 1", "Спортзал")
+PAIR_TIMES = (
+    (9, 0, 10, 20),
+    (10, 30, 11, 50),
+    (12, 0, 13, 20),
+    (13, 30, 14, 50),
+    (15, 0, 16, 20),
+    (16, 30, 17, 50),
+    (18, 0, 19, 20),
+)
+
+
+def _ms_date(hour: int, minute: int) -> str:
+    moment = datetime(1970, 1, 1, hour, minute)
+    return f"/Date({int((moment - datetime(1970, 1, 1)).total_seconds() * 1000)})/"
+
+
+def make_payload(lessons: int, dated: bool = False, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    semester_start = core._week_start_date()
+    items = []
+    for number in range(lessons):
+        day = number % 6 + 1
+        week = (number // 6) % (SEMESTER_WEEKS if dated else 4)
+        pair = (number // (6 * (SEMESTER_WEEKS if dated else 4))) % len(PAIR_TIMES)
+        start_h, start_m, end_h, end_m = PAIR_TIMES[pair]
+        item = {
+            "Day": day,
+            "DayNumber": 0 if dated else week,
+            "Time": {"Time": f"{pair + 1} пара"},
+            "Class": {
+                "Name": f"{rng.choice(SUBJECTS)} [{rng.choice(TYPES)}]",
+                "TeacherFull": rng.choice(TEACHERS),
+            },
+            "Group": {"Name": "ИТД-11М"},
+            "Room": {"Name": rng.choice(ROOMS)},
+        }
+        if dated:
+            lesson_day = semester_start + timedelta(days=week * 7 + day - 1)
+            item["Date"] = f"{lesson_day.isoformat()}T00:00:00"
+            item["Time"]["TimeFrom"] = f"{lesson_day.isoformat()}T{start_h:02d}:{start_m:02d}:00"
+            item["Time"]["TimeTo"] = f"{lesson_day.isoformat()}T{end_h:02d}:{end_m:02d}:00"
+        else:
+            item["Time"]["TimeFrom"] = _ms_date(start_h, start_m)
+            item["Time"]["TimeTo"] = _ms_date(end_h, end_m)
+        items.append(item)
+    return {"Times": [], "Data": items, "Semestr": "Весна 2026"}
+
+
+def encode_payload(payload: dict) -> bytes:
+    return BOM + json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _recording_path(directory: str, group: str) -> str:
+    return os.path.join(directory, urlparse.quote(group, safe="") + ".json")
+
+
+@dataclass
+class UpstreamConfig:
+    directory: str | None = None
+    payloads: dict[str, bytes] = field(default_factory=dict)
+    synthetic: int = 0
+    challenge: bool = True
+    cookie_ttl: float = 0.0
+    latency: float = 0.0
+    jitter: float = 0.0
+    slow_body: int = 0
+    error_rate: float = 0.0
+    error_status: int = 503
+    timeout_rate: float = 0.0
+    hang: float = 30.0
+    seed: int | None = None
+
+
+class StandIn:
+    def __init__(self, config: UpstreamConfig) -> None:
+        self.config = config
+        self._lock = threading.Lock()
+        self._rng = random.Random(config.seed)
+        self._recordings: dict[str, bytes] = dict(config.payloads)
+        self._cookie = secrets.token_hex(8)
+        self._cookie_issued = time.time()
+        self.stats = {
+            "posts": 0,
+            "challenges": 0,
+            "replayed": 0,
+            "synthetic": 0,
+            "missing": 0,
+            "errors": 0,
+            "timeouts": 0,
+        }
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def stats_snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def delay(self) -> float:
+        latency = self.config.latency
+        if self.config.jitter:
+            with self._lock:
+                latency += self._rng.uniform(0, self.config.jitter)
+        return latency
+
+    def current_cookie(self) -> str:
+        with self._lock:
+            ttl = self.config.cookie_ttl
+            if ttl and time.time() - self._cookie_issued > ttl:
+                self._cookie = secrets.token_hex(8)
+                self._cookie_issued = time.time()
+            return f"wl={self._cookie}"
+
+    def body_for(self, group: str) -> bytes:
+        with self._lock:
+            body = self._recordings.get(group)
+        if body is not None:
+            self.count("replayed")
+            return body
+        if self.config.directory:
+            try:
+                with open(_recording_path(self.config.directory, group), "rb") as fh:
+                    body = fh.read()
+            except FileNotFoundError:
+                body = None
+            if body is not None:
+                with self._lock:
+                    self._recordings[group] = body
+                self.count("replayed")
+                return body
+        if self.config.synthetic > 0:
+            self.count("synthetic")
+            seed = sum(group.encode("utf-8"))
+            body = encode_payload(make_payload(self.config.synthetic, seed=seed))
+            with self._lock:
+                self._recordings[group] = body
+            return body
+        self.count("missing")
+        return encode_payload({"Times": [], "Data": [], "Semestr": ""})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server_version = "miet-stand-in"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    @property
+    def stand_in(self) -> StandIn:
+        return self.server.stand_in
+
+    def _respond(self, status: int, content_type: str, body: bytes, extra=()) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in extra:
+            self.send_header(name, value)
+        self.end_headers()
+        rate = self.stand_in.config.slow_body
+        if rate <= 0:
+            self.wfile.write(body)
+            return
+        step = max(rate // 10, 1)
+        for start in range(0, len(body), step):
+            self.wfile.write(body[start : start + step])
+            self.wfile.flush()
+            time.sleep(step / rate)
+
+    def do_GET(self) -> None:
+        if urlparse.urlsplit(self.path).path == STATS_PATH:
+            body = json.dumps(self.stand_in.stats_snapshot()).encode("utf-8")
+            self._respond(200, "application/json", body)
+            return
+        self._respond(404, "text/plain; charset=utf-8", b"not found")
+
+    def do_POST(self) -> None:
+        stand_in = self.stand_in
+        length = int(self.headers.get("Content-Length") or 0)
+        form = urlparse.parse_qs(self.rfile.read(length).decode("utf-8"))
+        group = (form.get("group") or [""])[0]
+        stand_in.count("posts")
+        if urlparse.urlsplit(self.path).path != DATA_PATH:
+            self._respond(404, "text/plain; charset=utf-8", b"not found")
+            return
+        if stand_in.roll(stand_in.config.timeout_rate):
+            stand_in.count("timeouts")
+            time.sleep(stand_in.config.hang)
+            self.close_connection = True
+            return
+        delay = stand_in.delay()
+        if delay:
+            time.sleep(delay)
+        if stand_in.roll(stand_in.config.error_rate):
+            stand_in.count("errors")
+            status = stand_in.config.error_status
+            self._respond(status, "text/html; charset=utf-8", f"<h1>{status}</h1>".encode())
+            return
+        cookie = stand_in.current_cookie()
+        if stand_in.config.challenge and cookie not in (self.headers.get("Cookie") or ""):
+            stand_in.count("challenges")
+            page = (
+                "<html><head><script>"
+                f'document.cookie="{cookie};path=/";location.reload();'
+                "</script></head><body></body></html>"
+            )
+            self._respond(200, "text/html; charset=utf-8", page.encode("utf-8"))
+            return
+        self._respond(200, "application/json; charset=utf-8", stand_in.body_for(group))
+
+
+def start(
+    config: UpstreamConfig, host: str = "127.0.0.1", port: int = 0
+) -> tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.stand_in = StandIn(config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}{DATA_PATH}"
+
+
+def record(groups: list[str], directory: str) -> list[dict]:
+    os.makedirs(directory, exist_ok=True)
+    results = []
+    for group in dict.fromkeys(g for g in groups if g):
+        captured: list[str] = []
+        try:
+            core._run_exchange(group, core._capturing(core._decode_document, captured))
+        except Exception as exc:
+            results.append({"group": group, "ok": False, "error": str(exc)})
+            continue
+        body = "".join(captured).encode("utf-8")
+        with open(_recording_path(directory, group), "wb") as fh:
+            fh.write(body)
+        results.append({"group": group, "ok": True, "bytes": len(body)})
+    return results
+
+
+def _run_serve(args: argparse.Namespace) -> int:
+    config = UpstreamConfig(
+        directory=args.dir,
+        synthetic=args.synthetic,
+        challenge=not args.no_challenge,
+        cookie_ttl=args.cookie_ttl,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        slow_body=args.slow_body,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        timeout_rate=args.timeout_rate,
+        hang=args.hang,
+        seed=args.seed,
+    )
+    server, url = start(config, args.host, args.port)
+    print(f"Подставной сервер расписания: {url}")
+    print(f"Запусти приложение с MIET_DATA_URL={url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+def _run_record(args: argparse.Namespace) -> int:
+    groups = list(args.groups or [])
+    if args.groups_file:
+        groups += core._read_groups_file(args.groups_file)
+    if not groups:
+        groups = core._configured_warm_groups()
+    if args.upstream:
+        core.SCHEDULE_DATA_URL = args.upstream
+    results = record(groups, args.dir)
+    for result in results:
+        status = f"{result['bytes']} байт" if result["ok"] else f"ошибка: {result['error']}"
+        print(f"{result['group']}: {status}")
+    return 1 if any(not r["ok"] for r in results) else 0
+
+
+def _main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Подставной сервер расписания МИЭТ")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="отдавать записанные ответы")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--dir", default="recordings", help="каталог с записями")
+    serve.add_argument("--synthetic", type=int, default=0, help="занятий для неизвестных групп")
+    serve.add_argument("--no-challenge", action="store_true", help="не требовать cookie wl=")
+    serve.add_argument("--cookie-ttl", type=float, default=0.0, help="смена cookie, секунды")
+    serve.add_argument("--latency", type=float, default=0.0, help="задержка ответа, мс")
+    serve.add_argument("--jitter", type=float, default=0.0, help="случайная добавка, мс")
+    serve.add_argument("--slow-body", type=int, default=0, help="скорость тела, байт/с")
+    serve.add_argument("--error-rate", type=float, default=0.0)
+    serve.add_argument("--error-status", type=int, default=503)
+    serve.add_argument("--timeout-rate", type=float, default=0.0)
+    serve.add_argument("--hang", type=float, default=30.0, help="зависание при таймауте, с")
+    serve.add_argument("--seed", type=int)
+    rec = commands.add_parser("record", help="записать ответы miet.ru")
+    rec.add_argument("--groups", nargs="*", help="группы через пробел")
+    rec.add_argument("--groups-file", help="файл со списком групп, по одной в строке")
+    rec.add_argument("--dir", default="recordings", help="каталог для записей")
+    rec.add_argument("--upstream", help="адрес источника вместо MIET_DATA_URL")
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        return _run_record(args)
+    return _run_serve(args)
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
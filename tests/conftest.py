@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schedule as core
+import schedule_upstream as upstream
+
+
+def _reset_core() -> None:
+    core._cache.sweep(-1)
+    core._response_cache.sweep(-1)
+    core._cookie_jar.cookie = None
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    servers = []
+
+    def start(**options):
+        server, url = upstream.start(upstream.UpstreamConfig(**options))
+        servers.append(server)
+        monkeypatch.setattr(core, "SCHEDULE_DATA_URL", url)
+        return server.stand_in
+
+    _reset_core()
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+    _reset_core()
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import schedule as core
+import schedule_asgi
+
+
+async def _call(method: str, path: str, query: str = "", headers=(), body: bytes = b""):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query.encode("latin-1"),
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await schedule_asgi.app(scope, receive, send)
+    start = messages[0]
+    response_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in start["headers"]}
+    data = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], response_headers, data
+
+
+def test_range_matches_flask_and_honours_etag(stand_in):
+    stand_in(synthetic=30)
+    flask = core.app.test_client().get("/api/range?group=X&weeks=3&week=-1")
+    core._cache.sweep(-1)
+    core._response_cache.sweep(-1)
+
+    async def scenario():
+        first = await _call("GET", "/api/range", "group=X&weeks=3&week=-1")
+        again = await _call(
+            "GET", "/api/range", "group=X&weeks=3&week=-1", [("If-None-Match", first[1]["etag"])]
+        )
+        return first, again
+
+    (status, headers, data), again = asyncio.run(scenario())
+    assert status == 200
+    assert json.loads(data) == flask.get_json()
+    assert headers["etag"] == flask.headers["ETag"]
+    assert again[0] == 304 and again[2] == b""
+
+
+def test_warm_requires_token(stand_in, monkeypatch):
+    stand_in(synthetic=5)
+    monkeypatch.setattr(core, "WARM_TOKEN", "secret")
+
+    async def scenario():
+        denied = await _call("POST", "/api/warm", body=b'{"groups": ["X"]}')
+        allowed = await _call(
+            "POST", "/api/warm", headers=[("Authorization", "Bearer secret")], body=b'{"groups": ["X"]}'
+        )
+        return denied, allowed
+
+    denied, allowed = asyncio.run(scenario())
+    assert denied[0] == 403
+    assert allowed[0] == 200
+    report = json.loads(allowed[2])
+    assert report["ok"] and [r["group"] for r in report["results"]] == ["X"]
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+import schedule as core
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(args, env):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+
+def test_cli_warm_rows_are_shared_hits_for_the_server(stand_in, tmp_path):
+    server = stand_in(synthetic=12)
+    env = {
+        "MIET_CACHE_BACKEND": "sqlite",
+        "MIET_CACHE_PATH": str(tmp_path / "cache" / "cache.sqlite3"),
+        "MIET_DATA_URL": core.SCHEDULE_DATA_URL,
+    }
+    warm = _run(["schedule.py", "warm", "--groups", "A"], env)
+    assert warm.returncode == 0, warm.stdout + warm.stderr
+    posts = server.stats_snapshot()["posts"]
+    reader = _run(
+        [
+            "-c",
+            "import json, schedule; schedule._get_schedule('A'); "
+            "print(json.dumps(schedule._cache_stats))",
+        ],
+        env,
+    )
+    assert reader.returncode == 0, reader.stderr
+    assert "Не удалось прочитать" not in reader.stderr
+    assert json.loads(reader.stdout)["shared"] == 1
+    assert server.stats_snapshot()["posts"] == posts
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+import schedule as core
+import schedule_upstream as upstream
+
+
+def _lessons(entries):
+    return [
+        tuple(getattr(entry, name) for name in core.Lesson.__slots__) for entry in entries
+    ]
+
+
+def _chunked(text: str, size: int):
+    return [text[start : start + size] for start in range(0, len(text), size)]
+
+
+@pytest.fixture(params=[False, True], ids=["cyclic", "dated"])
+def payload(request):
+    return upstream.make_payload(40, dated=request.param, seed=7)
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, core.UPSTREAM_CHUNK_SIZE])
+def test_decode_entries_matches_parse_entries(payload, size):
+    text = upstream.encode_payload(payload).decode("utf-8")
+    expected = _lessons(core._parse_entries(payload))
+    assert expected
+    assert _lessons(core._decode_entries(_chunked(text, size))) == expected
+
+
+def test_decode_entries_skips_other_keys_and_whitespace():
+    item = upstream.make_payload(1)["Data"][0]
+    text = json.dumps(
+        {"Times": [{"Data": [item]}], "Data": [item, item], "Semestr": "x"},
+        ensure_ascii=False,
+        indent=2,
+    )
+    assert len(core._decode_entries(_chunked(text, 3))) == 2
+
+
+def test_decode_entries_handles_null_data():
+    assert core._decode_entries(['{"Data": null, "Semestr": ""}']) == []
+
+
+def test_number_split_across_chunks():
+    item = upstream.make_payload(1)["Data"][0]
+    item["Day"] = 123
+    text = json.dumps({"Data": [item]}, ensure_ascii=False)
+    cut = text.index("123") + 1
+    stream = core.JsonStream([text[:cut], text[cut:]])
+    assert [value["Day"] for value in stream.items("Data")] == [123]
+
+
+def test_truncated_body_raises():
+    text = upstream.encode_payload(upstream.make_payload(6)).decode("utf-8")
+    for cut in range(2, len(text)):
+        with pytest.raises(json.JSONDecodeError):
+            core._decode_entries(_chunked(text[:cut], 16))
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        '{"Data": [{"Day": 1,}]}',
+        '{"Data": [{} {}]}',
+        '{"Data": [{},]}',
+        '{"Data" [] }',
+        '{"Data": [] "Semestr": ""}',
+        '{"Data": [{"Day": 1}',
+        '{1: []}',
+    ],
+)
+def test_malformed_body_raises(body):
+    with pytest.raises(json.JSONDecodeError):
+        core._decode_entries(_chunked(body, 4))
+
+
+@pytest.mark.parametrize("body", ["", "﻿  ", "<html><script>document.cookie='wl=1';</script>"])
+def test_non_json_body_is_a_challenge(body):
+    with pytest.raises(core.ChallengePage) as info:
+        core._decode_entries(_chunked(body, 5))
+    assert info.value.text == body.lstrip("﻿ ")
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("/Date(32400000)/", "09:00"),
+        ("2026-03-04T13:30:00", "13:30"),
+        ("9:30 - 10:50", "9:30"),
+        (None, ""),
+    ],
+)
+def test_extract_time(value, expected):
+    assert core._extract_time(value) == expected
+
+
+def test_extract_date_value():
+    assert core._extract_date_value("/Date(1772582400000)/").isoformat() == "2026-03-04"
+    assert core._extract_date_value("/Date(32400000)/") is None
+    assert core._extract_date_value("2026-03-04T00:00:00").isoformat() == "2026-03-04"
+
+
+def test_decode_entries_reparses_only_changed_items(monkeypatch):
+    payload = upstream.make_payload(20, seed=1)
+    seen = {}
+    core._decode_entries(_chunked(upstream.encode_payload(payload).decode("utf-8"), 64), None, seen)
+    payload["Data"][3]["Room"]["Name"] = "9999"
+    text = upstream.encode_payload(payload).decode("utf-8")
+    calls = []
+    parse_item = core._parse_item
+    monkeypatch.setattr(core, "_parse_item", lambda item: calls.append(item) or parse_item(item))
+    items = {}
+    entries = core._decode_entries(_chunked(text, 7), seen, items)
+    assert len(calls) == 1
+    assert calls[0]["Room"]["Name"] == "9999"
+    assert _lessons(entries) == _lessons(core._parse_entries(payload))
+    assert len(items) == 20
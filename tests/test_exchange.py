@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+import schedule as core
+import schedule_upstream as upstream
+
+
+def test_challenge_sets_cookie_and_is_reused(stand_in):
+    server = stand_in(synthetic=20)
+    entries = core._run_exchange("ИТД-11М", core._decode_entries)
+    assert len(entries) == 20
+    assert server.stats_snapshot()["challenges"] == 1
+    assert core._cookie_jar.cookie.startswith("wl=")
+    core._run_exchange("ИТД-11М", core._decode_entries)
+    stats = server.stats_snapshot()
+    assert stats["posts"] == 3
+    assert stats["challenges"] == 1
+
+
+def test_rotated_cookie_is_renewed(stand_in):
+    server = stand_in(synthetic=5)
+    core._run_exchange("ИТД-11М", core._decode_entries)
+    old = core._cookie_jar.cookie
+    server.config.cookie_ttl = 0.2
+    time.sleep(0.3)
+    assert len(core._run_exchange("ИТД-11М", core._decode_entries)) == 5
+    assert core._cookie_jar.cookie != old
+    assert server.stats_snapshot()["challenges"] == 2
+
+
+def test_replayed_body_matches_parse_entries(stand_in):
+    payload = upstream.make_payload(30, dated=True, seed=3)
+    stand_in(payloads={"X": upstream.encode_payload(payload)}, slow_body=200_000)
+    entries = core._run_exchange("X", core._decode_entries)
+    expected = core._parse_entries(payload)
+    assert [e.subject for e in entries] == [e.subject for e in expected]
+    assert [e.date for e in entries] == [e.date for e in expected]
+
+
+def test_upstream_error_is_raised(stand_in):
+    stand_in(synthetic=5, challenge=False, error_rate=1.0, error_status=502)
+    with pytest.raises(Exception, match="502"):
+        core._run_exchange("X", core._decode_entries)
+
+
+def test_api_week_and_etag_are_stable_across_cache_resets(stand_in):
+    stand_in(synthetic=30)
+    client = core.app.test_client()
+    first = client.get("/api/week?group=X")
+    assert first.get_json()["ok"]
+    core._cache.sweep(-1)
+    core._response_cache.sweep(-1)
+    second = client.get("/api/week?group=X")
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.get_json()["version"] == first.get_json()["version"]
+    again = client.get("/api/week?group=X", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_api_reports_truncated_upstream_body(stand_in):
+    body = upstream.encode_payload(upstream.make_payload(10))
+    stand_in(payloads={"X": body[: len(body) // 2]}, challenge=False)
+    data = core.app.test_client().get("/api/week?group=X").get_json()
+    assert data["ok"] is False
+
+
+def test_ics_includes_cyclic_lessons(stand_in):
+    stand_in(synthetic=12, challenge=False)
+    body = core.app.test_client().get("/api/ics?group=X").get_data(as_text=True)
+    assert body.startswith("BEGIN:VCALENDAR")
+    assert body.count("BEGIN:VEVENT") > 0
+    assert body.rstrip().endswith("END:VCALENDAR")
+
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+import schedule as core
+
+
+def _cache(tmp_path, name="cache"):
+    return core.SQLiteCache(str(tmp_path / name / "cache.sqlite3"), 16)
+
+
+def test_roundtrip_and_no_connection_left_from_init(tmp_path):
+    cache = _cache(tmp_path)
+    assert getattr(cache._local, "conn", None) is None
+    cache.set("k", core.CacheEntry(ts=1.0, value={"a": 1}, size=1))
+    assert cache.get("k").value == {"a": 1}
+
+
+def test_forked_child_opens_its_own_connection(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("k", core.CacheEntry(ts=1.0, value="parent", size=1))
+    parent = cache._connect()
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        ok = cache._connect() is not parent and cache.get("k").value == "parent"
+        os.write(write, b"1" if ok else b"0")
+        os._exit(0)
+    os.close(write)
+    result = os.read(read, 1)
+    os.waitpid(pid, 0)
+    assert result == b"1"
+    assert cache._connect() is parent
+
+
+def test_readable_directory_is_accepted(tmp_path):
+    directory = tmp_path / "srv"
+    directory.mkdir(mode=0o755)
+    os.chmod(directory, 0o755)
+    _cache(tmp_path, "srv")
+
+
+def test_writable_directory_is_rejected(tmp_path):
+    directory = tmp_path / "shared"
+    directory.mkdir()
+    os.chmod(directory, 0o777)
+    with pytest.raises(RuntimeError, match="Небезопасные права"):
+        _cache(tmp_path, "shared")
+
+
+def test_new_directory_is_private(tmp_path):
+    _cache(tmp_path, "fresh")
+    assert os.stat(tmp_path / "fresh").st_mode & 0o077 == 0
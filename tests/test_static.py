@@ -0,0 +1,56 @@
+import json
+import os
+from datetime import timedelta
+
+import pytest
+
+import schedule as core
+import schedule_upstream as upstream
+
+
+def _assemble(out_dir: str, manifest: dict, group: str, today, offset: int):
+    entry = manifest["groups"][group]
+    start = core._week_start_date()
+    base_monday = start - timedelta(days=start.weekday())
+    weeks_since = (today - timedelta(days=today.weekday()) - base_monday).days // 7
+    number = max(weeks_since + 1 + offset, 1)
+    day = today + timedelta(days=offset * 7)
+    in_range = lambda value: entry["first_date"] <= value.isoformat() <= entry["last_date"]
+    if number > manifest["weeks"] or not in_range(day) or not in_range(today):
+        return None
+
+    def load(*parts):
+        with open(os.path.join(out_dir, group, *parts), encoding="utf-8") as fh:
+            return json.load(fh)
+
+    week = load("week", f"{number}.json")
+    now = load("today", f"{today.isoformat()}.json")
+    view = load("today", f"{day.isoformat()}.json")
+    return {
+        **week,
+        "week_label_now": now["week_label_now"],
+        "today_label": (view if entry["dated"] else now)["today_label"],
+        "lessons": view["lessons"],
+    }
+
+
+@pytest.mark.parametrize("dated", [False, True])
+def test_static_files_reproduce_bundle_view(stand_in, tmp_path, dated):
+    payload = upstream.make_payload(60, dated=dated, seed=5)
+    stand_in(payloads={"G": upstream.encode_payload(payload)})
+    results = core.build_static(["G"], str(tmp_path), weeks=6)
+    assert [r["ok"] for r in results] == [True]
+    manifest = json.loads((tmp_path / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["groups"]["G"]["dated"] is dated
+    schedule = core._get_schedule("G")
+    start = core._week_start_date()
+    checked = 0
+    for day_offset in (2, 9, 17, 25):
+        today = start + timedelta(days=day_offset)
+        for offset in (-1, 0, 1, 2):
+            static = _assemble(str(tmp_path), manifest, "G", today, offset)
+            if static is None:
+                continue
+            assert static == {"ok": True, **core._bundle_view("G", schedule, today, offset)}
+            checked += 1
+    assert checked >= 12